@@ -24,12 +24,92 @@ TARGETS_FILE = os.getenv("TARGETS_FILE", os.path.join(BASE_DIR, "data", "targets
 SCHEDULED_FILE = os.getenv("SCHEDULED_FILE", os.path.join(BASE_DIR, "data", "scheduled.json"))
 DRAFTS_FILE = os.getenv("DRAFTS_FILE", os.path.join(BASE_DIR, "data", "drafts.json"))
 STATS_FILE = os.getenv("STATS_FILE", os.path.join(BASE_DIR, "data", "stats.json"))
+PEERS_FILE = os.getenv("PEERS_FILE", os.path.join(BASE_DIR, "data", "peers.json"))
+RATE_LIMITS_FILE = os.getenv("RATE_LIMITS_FILE", os.path.join(BASE_DIR, "data", "rate_limits.json"))
+STATS_BUCKETS_FILE = os.getenv("STATS_BUCKETS_FILE", os.path.join(BASE_DIR, "data", "stats_buckets.json"))
+META_FILE = os.getenv("META_FILE", os.path.join(BASE_DIR, "data", "meta.json"))
+JOBS_FILE = os.getenv("JOBS_FILE", os.path.join(BASE_DIR, "data", "jobs.json"))
 
 os.makedirs(os.path.dirname(ACCOUNTS_FILE), exist_ok=True)
 os.makedirs(os.path.dirname(TARGETS_FILE), exist_ok=True)
 os.makedirs(os.path.dirname(SCHEDULED_FILE), exist_ok=True)
 os.makedirs(os.path.dirname(DRAFTS_FILE), exist_ok=True)
 os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+os.makedirs(os.path.dirname(RATE_LIMITS_FILE), exist_ok=True)
+os.makedirs(os.path.dirname(PEERS_FILE), exist_ok=True)
+os.makedirs(os.path.dirname(STATS_BUCKETS_FILE), exist_ok=True)
+os.makedirs(os.path.dirname(META_FILE), exist_ok=True)
+os.makedirs(os.path.dirname(JOBS_FILE), exist_ok=True)
+
+# Лимиты отправки для каждого аккаунта (можно переопределить в rate_limits.json)
+RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_PER_MINUTE", "20"))
+RATE_LIMIT_DAILY_QUOTA: int = int(os.getenv("RATE_LIMIT_DAILY_QUOTA", "0"))  # 0 - без ограничения
+
+# Кэш медиафайлов (по file_unique_id, LRU-вытеснение при превышении бюджета)
+MEDIA_CACHE_DIR: str = os.getenv("MEDIA_CACHE_DIR", os.path.join(BASE_DIR, "data", "media_cache"))
+MEDIA_CACHE_MAX_BYTES: int = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Файлы до этого размера передаются из памяти, без записи на диск
+MEDIA_MEMORY_THRESHOLD: int = int(os.getenv("MEDIA_MEMORY_THRESHOLD", str(8 * 1024 * 1024)))
+MEDIA_MEMORY_MAX_BYTES: int = int(os.getenv("MEDIA_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# FloodWait: сколько раз повторять отправку и какое максимальное ожидание допустимо
+FLOOD_MAX_RETRIES: int = int(os.getenv("FLOOD_MAX_RETRIES", "3"))
+FLOOD_WAIT_MAX_SECONDS: int = int(os.getenv("FLOOD_WAIT_MAX_SECONDS", "3600"))
+
+# Подключение аккаунтов при запуске: сколько одновременно и таймаут на аккаунт (сек)
+CONNECT_CONCURRENCY: int = int(os.getenv("CONNECT_CONCURRENCY", "10"))
+CONNECT_TIMEOUT: float = float(os.getenv("CONNECT_TIMEOUT", "30"))
+# Проверять авторизацию всех аккаунтов при запуске (иначе клиенты подключаются при первой отправке)
+CONNECT_ON_STARTUP: bool = os.getenv("CONNECT_ON_STARTUP", "True").lower() == "true"
+# Клиент аккаунта отключается после стольких секунд простоя
+CLIENT_IDLE_TIMEOUT: float = float(os.getenv("CLIENT_IDLE_TIMEOUT", "600"))
+
+# Проверка соединений аккаунтов: интервал (сек), таймаут проверки и максимальная пауза между переподключениями
+HEALTH_PROBE_INTERVAL: float = float(os.getenv("HEALTH_PROBE_INTERVAL", "60"))
+HEALTH_PROBE_TIMEOUT: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", "15"))
+HEALTH_MAX_BACKOFF: float = float(os.getenv("HEALTH_MAX_BACKOFF", "300"))
+
+# Число процессов-шардов для клиентов аккаунтов (0 - все клиенты в процессе бота).
+# Аккаунты распределяются по шардам по хешу имени, процесс бота координирует их
+ACCOUNT_SHARDS: int = int(os.getenv("ACCOUNT_SHARDS", "0"))
+
+# Выбор аккаунта для получателей без назначений: random, lru, least_loaded, quota
+ACCOUNT_SELECTION: str = os.getenv("ACCOUNT_SELECTION", "random").lower()
+
+# Сколько рассылок с интервалом могут отправлять одновременно (остальные ждут своей очереди)
+JOBS_MAX_CONCURRENT: int = int(os.getenv("JOBS_MAX_CONCURRENT", "3"))
+# Ёмкость общей очереди отправок на каждый класс приоритета (interactive, scheduled, bulk)
+SEND_QUEUE_CAPACITY: int = int(os.getenv("SEND_QUEUE_CAPACITY", "500"))
+# Сообщение с прогрессом отправки обновляется не чаще раза в столько секунд
+JOB_PROGRESS_INTERVAL: float = float(os.getenv("JOB_PROGRESS_INTERVAL", "5"))
+# Мгновенная отправка (без интервала): сколько получателей отправляются одновременно
+JOB_SEND_WINDOW: int = int(os.getenv("JOB_SEND_WINDOW", "100"))
+
+# Хранилище: "json" (по файлу на коллекцию) или "sqlite" (WAL, построчная запись)
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "json").lower()
+SQLITE_FILE = os.getenv("SQLITE_FILE", os.path.join(BASE_DIR, "data", "storage.db"))
+os.makedirs(os.path.dirname(SQLITE_FILE), exist_ok=True)
+
+# Отложенная запись (сек) по коллекциям: изменения за это окно сохраняются одной записью.
+# 0 - запись сразу. Переопределение: STORAGE_FLUSH_DELAYS="stats=10,scheduled=0"
+STORAGE_FLUSH_DELAYS = {
+    "accounts": 0,
+    "meta": 0,
+    "targets": 0.5,
+    "drafts": 0.5,
+    "scheduled": 0.5,
+    # Курсор рассылки JobEngine записывает сразу, окно - для остальных изменений
+    "jobs": 1,
+    "stats": 5,
+    "stats_buckets": 5,
+    "rate_limits": 5,
+    "peers": 5,
+}
+for item in os.getenv("STORAGE_FLUSH_DELAYS", "").split(","):
+    if "=" in item:
+        collection, delay = item.split("=", 1)
+        STORAGE_FLUSH_DELAYS[collection.strip()] = float(delay)
 
 DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
 LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
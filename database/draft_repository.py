@@ -0,0 +1,77 @@
+# database/draft_repository.py
+
+
+class DraftRepository:
+    """Черновики с индексом по id и монотонной выдачей id.
+
+    Итерация идёт в порядке создания, поэтому для списков и сохранения
+    в JSON репозиторий ведёт себя как прежний list. Следующий id хранится
+    в storage.meta["next_draft_id"] и не переиспользуется после удаления.
+    """
+
+    def __init__(self, storage):
+        self._storage = storage
+        self._drafts = {}
+
+    def load(self, drafts):
+        """Заполняет индекс; черновикам с повторяющимся id выдаются новые"""
+        self._drafts = {}
+        duplicates = []
+        for draft in drafts:
+            if draft.get("id") in self._drafts:
+                duplicates.append(draft)
+            else:
+                self._drafts[draft["id"]] = draft
+
+        next_id = max(self._drafts, default=0) + 1
+        if self._storage.meta.get("next_draft_id", 1) < next_id:
+            self._storage.meta["next_draft_id"] = next_id
+
+        for draft in duplicates:
+            draft["id"] = self._allocate_id()
+            self._drafts[draft["id"]] = draft
+        return [draft["id"] for draft in duplicates]
+
+    def _allocate_id(self):
+        draft_id = self._storage.meta.get("next_draft_id", 1)
+        self._storage.meta["next_draft_id"] = draft_id + 1
+        self._storage.save_meta("next_draft_id")
+        return draft_id
+
+    def __iter__(self):
+        return iter(self._drafts.values())
+
+    def __len__(self):
+        return len(self._drafts)
+
+    def __contains__(self, draft_id):
+        return draft_id in self._drafts
+
+    def get(self, draft_id):
+        return self._drafts.get(draft_id)
+
+    def create(self, draft):
+        """Добавляет черновик с новым id и сохраняет только его"""
+        draft["id"] = self._allocate_id()
+        self._drafts[draft["id"]] = draft
+        self._storage._link_draft(draft)
+        self._storage.save_drafts(draft["id"])
+        return draft
+
+    def update(self, draft_id, **fields):
+        """Меняет поля черновика и сохраняет только его; None, если черновика нет"""
+        draft = self._drafts.get(draft_id)
+        if draft is None:
+            return None
+        self._storage._unlink_draft(draft)
+        draft.update(fields)
+        self._storage._link_draft(draft)
+        self._storage.save_drafts(draft_id)
+        return draft
+
+    def delete(self, draft_id):
+        draft = self._drafts.pop(draft_id, None)
+        if draft is not None:
+            self._storage._unlink_draft(draft)
+            self._storage.save_drafts(draft_id)
+        return draft
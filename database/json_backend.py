@@ -0,0 +1,38 @@
+# database/json_backend.py
+import json
+import os
+import threading
+
+
+class JsonBackend:
+    """Хранение каждой коллекции в отдельном JSON-файле (файл перезаписывается целиком)"""
+
+    row_level = False
+
+    def __init__(self, files):
+        self.files = files
+
+    def load(self):
+        data = {}
+        for name, path in self.files.items():
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data[name] = json.load(f)
+        return data
+
+    def save(self, name, data, keys=None):
+        """keys игнорируются: JSON-файл всегда пишется целиком.
+
+        Запись атомарная: временный файл + rename, поэтому падение
+        посреди записи не портит предыдущую версию.
+        """
+        path = self.files[name]
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        pass
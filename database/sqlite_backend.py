@@ -0,0 +1,236 @@
+# database/sqlite_backend.py
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    name TEXT PRIMARY KEY,
+    api_id INTEGER NOT NULL,
+    api_hash TEXT NOT NULL,
+    phone TEXT
+);
+CREATE TABLE IF NOT EXISTS targets (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    username TEXT,
+    chat_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    target_id TEXT NOT NULL,
+    account TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (target_id, account)
+);
+CREATE TABLE IF NOT EXISTS drafts (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scheduled (
+    id TEXT PRIMARY KEY,
+    time TEXT NOT NULL,
+    target_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scheduled_time ON scheduled (time);
+CREATE TABLE IF NOT EXISTS stats (
+    account TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, key)
+);
+"""
+
+# Ключ строки общей статистики в таблице stats
+GENERAL_STATS_KEY = ""
+
+# Коллекции, которые хранятся в универсальной таблице kv
+KV_COLLECTIONS = ("rate_limits", "peers", "stats_buckets", "meta", "jobs")
+
+
+class SQLiteBackend:
+    """Хранение в SQLite (режим WAL) с построчной транзакционной записью.
+
+    save(name, data, keys) с keys=None переписывает коллекцию целиком,
+    а с набором ключей обновляет/удаляет только эти строки.
+    """
+
+    row_level = True
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def is_imported(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'imported'").fetchone()
+        return row is not None
+
+    def import_from(self, collections):
+        """Одноразовый перенос данных из JSON-файлов"""
+        with self.conn:
+            for name, data in collections.items():
+                self._write(name, data, None)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('imported', '1')")
+
+    def load(self):
+        cur = self.conn.cursor()
+        data = {}
+
+        data["accounts"] = {
+            name: {"api_id": api_id, "api_hash": api_hash, "phone": phone or ""}
+            for name, api_id, api_hash, phone in cur.execute(
+                "SELECT name, api_id, api_hash, phone FROM accounts ORDER BY rowid"
+            )
+        }
+
+        targets = {}
+        for target_id, target_type, username, chat_id in cur.execute(
+            "SELECT id, type, username, chat_id FROM targets ORDER BY rowid"
+        ):
+            target = {"type": target_type}
+            if target_type == "user":
+                target["username"] = username
+            else:
+                target["chat_id"] = chat_id
+            target["assigned_accounts"] = []
+            targets[target_id] = target
+        for target_id, account in cur.execute(
+            "SELECT target_id, account FROM assignments ORDER BY target_id, position"
+        ):
+            if target_id in targets:
+                targets[target_id]["assigned_accounts"].append(account)
+        data["targets"] = targets
+
+        data["drafts"] = [json.loads(row[0]) for row in cur.execute("SELECT data FROM drafts ORDER BY id")]
+        data["scheduled"] = [json.loads(row[0]) for row in cur.execute("SELECT data FROM scheduled ORDER BY rowid")]
+
+        stats = {"general": {}, "accounts": {}}
+        for account, row in cur.execute("SELECT account, data FROM stats"):
+            if account == GENERAL_STATS_KEY:
+                stats["general"] = json.loads(row)
+            else:
+                stats["accounts"][account] = json.loads(row)
+        data["stats"] = stats
+
+        for collection in KV_COLLECTIONS:
+            data[collection] = {
+                key: json.loads(row)
+                for key, row in cur.execute(
+                    "SELECT key, data FROM kv WHERE collection = ? ORDER BY rowid", (collection,)
+                )
+            }
+
+        return data
+
+    def save(self, name, data, keys=None):
+        with self._lock, self.conn:
+            self._write(name, data, keys)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _write(self, name, data, keys):
+        if name == "accounts":
+            self._write_rows("accounts", "name", data, keys, self._upsert_account)
+        elif name == "targets":
+            self._write_rows("targets", "id", data, keys, self._upsert_target)
+            if keys is None:
+                self.conn.execute("DELETE FROM assignments")
+            else:
+                self.conn.executemany("DELETE FROM assignments WHERE target_id = ?", [(k,) for k in keys])
+            for target_id in (data if keys is None else keys):
+                target = data.get(target_id)
+                if target:
+                    self.conn.executemany(
+                        "INSERT INTO assignments (target_id, account, position) VALUES (?, ?, ?)",
+                        [(target_id, acc, i) for i, acc in enumerate(target.get("assigned_accounts", []))]
+                    )
+        elif name == "drafts":
+            rows = {draft["id"]: draft for draft in data}
+            self._write_rows("drafts", "id", rows, keys, self._upsert_draft)
+        elif name == "scheduled":
+            rows = {msg["id"]: msg for msg in data}
+            self._write_rows("scheduled", "id", rows, keys, self._upsert_scheduled)
+        elif name == "stats":
+            rows = dict(data.get("accounts", {}))
+            rows[GENERAL_STATS_KEY] = data.get("general", {})
+            if keys is not None:
+                keys = set(keys) | {GENERAL_STATS_KEY}
+            self._write_rows("stats", "account", rows, keys, self._upsert_stats)
+        elif name in KV_COLLECTIONS:
+            if keys is None:
+                self.conn.execute("DELETE FROM kv WHERE collection = ?", (name,))
+                keys = data.keys()
+            for key in keys:
+                if key in data:
+                    self.conn.execute(
+                        "INSERT INTO kv (collection, key, data) VALUES (?, ?, ?) "
+                        "ON CONFLICT (collection, key) DO UPDATE SET data = excluded.data",
+                        (name, key, json.dumps(data[key], ensure_ascii=False))
+                    )
+                else:
+                    self.conn.execute("DELETE FROM kv WHERE collection = ? AND key = ?", (name, key))
+        else:
+            raise ValueError(f"Неизвестная коллекция: {name}")
+
+    def _write_rows(self, table, key_column, rows, keys, upsert):
+        if keys is None:
+            self.conn.execute(f"DELETE FROM {table}")
+            keys = rows.keys()
+        for key in keys:
+            if key in rows:
+                upsert(key, rows[key])
+            else:
+                self.conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+
+    def _upsert_account(self, name, acc):
+        self.conn.execute(
+            "INSERT INTO accounts (name, api_id, api_hash, phone) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET api_id = excluded.api_id, "
+            "api_hash = excluded.api_hash, phone = excluded.phone",
+            (name, acc["api_id"], acc["api_hash"], acc.get("phone", ""))
+        )
+
+    def _upsert_target(self, target_id, target):
+        self.conn.execute(
+            "INSERT INTO targets (id, type, username, chat_id) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET type = excluded.type, "
+            "username = excluded.username, chat_id = excluded.chat_id",
+            (target_id, target["type"], target.get("username"), target.get("chat_id"))
+        )
+
+    def _upsert_draft(self, draft_id, draft):
+        self.conn.execute(
+            "INSERT INTO drafts (id, data) VALUES (?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET data = excluded.data",
+            (draft_id, json.dumps(draft, ensure_ascii=False))
+        )
+
+    def _upsert_scheduled(self, msg_id, msg):
+        self.conn.execute(
+            "INSERT INTO scheduled (id, time, target_id, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET time = excluded.time, "
+            "target_id = excluded.target_id, data = excluded.data",
+            (msg_id, msg["time"], msg.get("target_id"), json.dumps(msg, ensure_ascii=False))
+        )
+
+    def _upsert_stats(self, account, data):
+        self.conn.execute(
+            "INSERT INTO stats (account, data) VALUES (?, ?) "
+            "ON CONFLICT (account) DO UPDATE SET data = excluded.data",
+            (account, json.dumps(data, ensure_ascii=False))
+        )
@@ -1,94 +1,419 @@
 # database/storage.py
-import json
+import asyncio
 import os
-from telethon import TelegramClient
+import uuid
+from array import array
+from collections import deque
+from utils.clients import LazyClient
+from database.json_backend import JsonBackend
+from database.draft_repository import DraftRepository
+
+
+def _copy(value):
+    """Копирует вложенные dict/list (значения-примитивы общие), array и deque превращает в list"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, (list, array, deque)):
+        return [_copy(v) for v in value]
+    return value
+
 
 class Storage:
     def __init__(self):
         self.accounts = {}
         self.targets = {}
-        self.drafts = []
+        self.meta = {}
+        self.drafts = DraftRepository(self)
         self.scheduled_messages = []
         self.stats = {"sent": 0, "last_send": None}
         self.account_stats = {}
-        
+        self.rate_limits = {}
+        self.peers = {}
+        self.stats_buckets = {}
+        self.jobs = {}
+        self.backend = None
+        self._dirty = {}
+        self._flush_tasks = {}
+        self._flush_lock = asyncio.Lock()
+        # Записи, уже идущие в фоновом потоке (их нельзя прервать отменой задачи)
+        self._writes = set()
+        self._versions = {}
+        # Обратные индексы для каскадного удаления
+        self._drafts_by_target = {}
+        self._scheduled_by_target = {}
+        self._targets_by_account = {}
+
 
         os.makedirs("data", exist_ok=True)
         os.makedirs("sessions", exist_ok=True)
-    
+
+    def _json_files(self):
+        from config import ACCOUNTS_FILE, TARGETS_FILE, SCHEDULED_FILE, DRAFTS_FILE, STATS_FILE, RATE_LIMITS_FILE, PEERS_FILE, STATS_BUCKETS_FILE, META_FILE, JOBS_FILE
+        return {
+            "accounts": ACCOUNTS_FILE,
+            "targets": TARGETS_FILE,
+            "scheduled": SCHEDULED_FILE,
+            "drafts": DRAFTS_FILE,
+            "stats": STATS_FILE,
+            "rate_limits": RATE_LIMITS_FILE,
+            "peers": PEERS_FILE,
+            "stats_buckets": STATS_BUCKETS_FILE,
+            "meta": META_FILE,
+            "jobs": JOBS_FILE,
+        }
+
+    def _open_backend(self):
+        from config import STORAGE_BACKEND, SQLITE_FILE
+        json_backend = JsonBackend(self._json_files())
+        if STORAGE_BACKEND != "sqlite":
+            return json_backend
+
+        from database.sqlite_backend import SQLiteBackend
+        backend = SQLiteBackend(SQLITE_FILE)
+        if not backend.is_imported():
+            # Первый запуск на SQLite: переносим данные из JSON-файлов
+            collections = json_backend.load()
+            for msg in collections.get("scheduled", []):
+                msg.setdefault("id", self.new_scheduled_id())
+            # id черновика - первичный ключ: повторы из JSON получают новые id
+            drafts = collections.get("drafts", [])
+            next_id = max((draft["id"] for draft in drafts), default=0) + 1
+            seen = set()
+            for draft in drafts:
+                if draft["id"] in seen:
+                    draft["id"] = next_id
+                    next_id += 1
+                seen.add(draft["id"])
+            backend.import_from(collections)
+            print(f"📦 Импортировано из JSON в SQLite: {', '.join(collections) or 'нет данных'}")
+        return backend
+
     def load_all(self):
-        from config import ACCOUNTS_FILE, TARGETS_FILE, SCHEDULED_FILE, DRAFTS_FILE, STATS_FILE
-        
-        if os.path.exists(ACCOUNTS_FILE):
-            with open(ACCOUNTS_FILE, 'r', encoding='utf-8') as f:
-                accounts_data = json.load(f)
-                for name, data in accounts_data.items():
-                    self.accounts[name] = {
-                        "api_id": data["api_id"],
-                        "api_hash": data["api_hash"],
-                        "phone": data.get("phone", ""),
-                        "client": TelegramClient(f"sessions/{name}", data["api_id"], data["api_hash"])
-                    }
-        
-        if os.path.exists(TARGETS_FILE):
-            with open(TARGETS_FILE, 'r', encoding='utf-8') as f:
-                self.targets = json.load(f)
-        
-        if os.path.exists(SCHEDULED_FILE):
-            with open(SCHEDULED_FILE, 'r', encoding='utf-8') as f:
-                self.scheduled_messages = json.load(f)
-        
-        if os.path.exists(DRAFTS_FILE):
-            with open(DRAFTS_FILE, 'r', encoding='utf-8') as f:
-                self.drafts = json.load(f)
-        
-        if os.path.exists(STATS_FILE):
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                loaded_stats = json.load(f)
-                self.stats = loaded_stats.get("general", {})
-                self.account_stats = loaded_stats.get("accounts", {})
-    
-    def save_accounts(self):
-        from config import ACCOUNTS_FILE
-        data = {}
-        for name, acc in self.accounts.items():
-            data[name] = {
+        self.backend = self._open_backend()
+        data = self.backend.load()
+
+        for name, acc in data.get("accounts", {}).items():
+            self.accounts[name] = {
                 "api_id": acc["api_id"],
                 "api_hash": acc["api_hash"],
-                "phone": acc.get("phone", "")
+                "phone": acc.get("phone", ""),
+                "client": LazyClient(name, acc["api_id"], acc["api_hash"])
             }
-        with open(ACCOUNTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    def save_targets(self):
-        from config import TARGETS_FILE
-        with open(TARGETS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.targets, f, ensure_ascii=False, indent=2)
-    
-    def save_scheduled(self):
-        from config import SCHEDULED_FILE
-        with open(SCHEDULED_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.scheduled_messages, f, ensure_ascii=False, indent=2)
-    
-    def save_drafts(self):
-        from config import DRAFTS_FILE
-        with open(DRAFTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.drafts, f, ensure_ascii=False, indent=2)
-    
-    def save_stats(self):
-        from config import STATS_FILE
-        data = {
-            "general": self.stats,
-            "accounts": self.account_stats
-        }
-        with open(STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    
+
+        self.targets = data.get("targets", self.targets)
+        self.scheduled_messages = data.get("scheduled", self.scheduled_messages)
+        self.meta = data.get("meta", self.meta)
+        renumbered = self.drafts.load(data.get("drafts", []))
+        if renumbered:
+            self.save_drafts()
+
+        if "stats" in data:
+            self.stats = data["stats"].get("general", {})
+            self.account_stats = data["stats"].get("accounts", {})
+
+        self.rate_limits = data.get("rate_limits", self.rate_limits)
+        self.peers = data.get("peers", self.peers)
+        self.stats_buckets = data.get("stats_buckets", self.stats_buckets)
+        self.jobs = data.get("jobs", self.jobs)
+
+        # Записи, созданные до появления id, получают его при загрузке
+        missing = [msg for msg in self.scheduled_messages if "id" not in msg]
+        for msg in missing:
+            msg["id"] = self.new_scheduled_id()
+        if missing:
+            self.save_scheduled()
+
+        self._rebuild_indexes()
+
+    @staticmethod
+    def new_scheduled_id():
+        return uuid.uuid4().hex
+
+    def _rebuild_indexes(self):
+        self._drafts_by_target = {}
+        self._scheduled_by_target = {}
+        self._targets_by_account = {}
+        for draft in self.drafts:
+            self._link_draft(draft)
+        for msg in self.scheduled_messages:
+            self._scheduled_by_target.setdefault(msg.get("target_id"), {})[msg["id"]] = msg
+        for target_id, target in self.targets.items():
+            for account_name in target.get("assigned_accounts", []):
+                self._targets_by_account.setdefault(account_name, set()).add(target_id)
+
+    def _link_draft(self, draft):
+        for target_id in draft.get("target_ids", []):
+            self._drafts_by_target.setdefault(target_id, set()).add(draft["id"])
+
+    def _unlink_draft(self, draft):
+        for target_id in draft.get("target_ids", []):
+            draft_ids = self._drafts_by_target.get(target_id)
+            if draft_ids:
+                draft_ids.discard(draft["id"])
+
+    def add_scheduled(self, *msgs):
+        for msg in msgs:
+            self.scheduled_messages.append(msg)
+            self._scheduled_by_target.setdefault(msg.get("target_id"), {})[msg["id"]] = msg
+        if msgs:
+            self.save_scheduled(*(msg["id"] for msg in msgs))
+
+    def remove_scheduled(self, msgs):
+        """Удаляет запланированные сообщения (сами объекты из scheduled_messages)"""
+        removed = {id(msg) for msg in msgs}
+        if not removed:
+            return
+        self.scheduled_messages = [msg for msg in self.scheduled_messages if id(msg) not in removed]
+        for msg in msgs:
+            by_target = self._scheduled_by_target.get(msg.get("target_id"))
+            if by_target:
+                by_target.pop(msg["id"], None)
+        self.save_scheduled(*(msg["id"] for msg in msgs))
+
+    def assign_account(self, target_id, account_name):
+        """Назначает аккаунт получателю; False, если уже назначен"""
+        assigned = self.targets[target_id].setdefault("assigned_accounts", [])
+        if account_name in assigned:
+            return False
+        assigned.append(account_name)
+        self._targets_by_account.setdefault(account_name, set()).add(target_id)
+        self.save_targets(target_id)
+        return True
+
+    def unassign_account(self, target_id, account_name):
+        self.targets[target_id]["assigned_accounts"].remove(account_name)
+        target_ids = self._targets_by_account.get(account_name)
+        if target_ids:
+            target_ids.discard(target_id)
+        self.save_targets(target_id)
+
+    def delete_targets(self, *target_ids):
+        """Удаляет получателей вместе со ссылками на них в черновиках и запланированных.
+
+        Затрагиваются только связанные записи (по обратным индексам), изменения
+        каждой коллекции сохраняются одной записью. Возвращает удалённые
+        запланированные сообщения, чтобы их можно было убрать из очереди.
+        """
+        deleted = []
+        changed_drafts = set()
+        removed_scheduled = []
+        for target_id in target_ids:
+            target = self.targets.pop(target_id, None)
+            if target is None:
+                continue
+            deleted.append(target_id)
+
+            for account_name in target.get("assigned_accounts", []):
+                linked = self._targets_by_account.get(account_name)
+                if linked:
+                    linked.discard(target_id)
+
+            for draft_id in self._drafts_by_target.pop(target_id, ()):
+                draft = self.drafts.get(draft_id)
+                if draft and target_id in draft.get("target_ids", []):
+                    draft["target_ids"].remove(target_id)
+                    changed_drafts.add(draft_id)
+
+            removed_scheduled.extend(self._scheduled_by_target.pop(target_id, {}).values())
+
+        if removed_scheduled:
+            removed = {id(msg) for msg in removed_scheduled}
+            self.scheduled_messages = [msg for msg in self.scheduled_messages if id(msg) not in removed]
+
+        if deleted:
+            self.save_targets(*deleted)
+        if changed_drafts:
+            self.save_drafts(*changed_drafts)
+        if removed_scheduled:
+            self.save_scheduled(*(msg["id"] for msg in removed_scheduled))
+        return removed_scheduled
+
+    def delete_account(self, name):
+        """Удаляет аккаунт и снимает его назначения с получателей"""
+        changed_targets = []
+        for target_id in self._targets_by_account.pop(name, ()):
+            assigned = self.targets.get(target_id, {}).get("assigned_accounts", [])
+            if name in assigned:
+                assigned.remove(name)
+                changed_targets.append(target_id)
+        self.accounts.pop(name, None)
+
+        self.save_accounts(name)
+        if changed_targets:
+            self.save_targets(*changed_targets)
+        return changed_targets
+
+    def version(self, name):
+        """Счётчик изменений коллекции: растёт при каждом save_*, по нему сбрасываются кэши"""
+        return self._versions.get(name, 0)
+
+    def _collection_data(self, name):
+        if name == "accounts":
+            return {
+                acc_name: {
+                    "api_id": acc["api_id"],
+                    "api_hash": acc["api_hash"],
+                    "phone": acc.get("phone", "")
+                }
+                for acc_name, acc in self.accounts.items()
+            }
+        if name == "targets":
+            return self.targets
+        if name == "scheduled":
+            return self.scheduled_messages
+        if name == "drafts":
+            return list(self.drafts)
+        if name == "stats":
+            return {"general": self.stats, "accounts": self.account_stats}
+        if name == "rate_limits":
+            return self.rate_limits
+        if name == "peers":
+            return self.peers
+        if name == "stats_buckets":
+            return self.stats_buckets
+        if name == "meta":
+            return self.meta
+        if name == "jobs":
+            return self.jobs
+        raise ValueError(f"Неизвестная коллекция: {name}")
+
+    def _snapshot(self, name, keys):
+        """Копия данных для записи вне event loop (только изменённые записи, если backend это умеет)"""
+        if keys is None or not self.backend.row_level:
+            return _copy(self._collection_data(name))
+        if name == "drafts":
+            return [_copy(self.drafts.get(k)) for k in keys if k in self.drafts]
+        if name == "scheduled":
+            return [_copy(item) for item in self.scheduled_messages if item.get("id") in keys]
+        if name == "stats":
+            return {
+                "general": _copy(self.stats),
+                "accounts": {k: _copy(self.account_stats[k]) for k in keys if k in self.account_stats}
+            }
+        data = self._collection_data(name)
+        return {k: _copy(data[k]) for k in keys if k in data}
+
+    def _mark_dirty(self, name, keys):
+        if name in self._dirty and self._dirty[name] is None:
+            return
+        if keys is None:
+            self._dirty[name] = None
+        else:
+            # dict, а не set: строки записываются (и получают rowid) в порядке изменений,
+            # поэтому после перезапуска записи идут в том же порядке, что и добавлялись
+            self._dirty.setdefault(name, {}).update(dict.fromkeys(keys))
+
+    def _save(self, name, keys):
+        """Помечает коллекцию изменённой; keys - изменённые записи, пусто - вся коллекция.
+
+        Изменения за окно STORAGE_FLUSH_DELAYS[name] сохраняются одной записью
+        в фоновом потоке. Без запущенного event loop запись выполняется сразу.
+        """
+        from config import STORAGE_FLUSH_DELAYS
+        self._versions[name] = self._versions.get(name, 0) + 1
+        if self.backend is None:
+            self.backend = self._open_backend()
+        self._mark_dirty(name, keys or None)
+
+        delay = STORAGE_FLUSH_DELAYS.get(name, 0)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None or delay <= 0:
+            self._flush_now(name)
+        elif name not in self._flush_tasks:
+            self._flush_tasks[name] = loop.create_task(self._delayed_flush(name, delay))
+
+    def _flush_now(self, name):
+        keys = self._dirty.pop(name, None)
+        self.backend.save(name, self._snapshot(name, keys), keys)
+
+    async def _delayed_flush(self, name, delay):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            if self._flush_tasks.get(name) is asyncio.current_task():
+                del self._flush_tasks[name]
+        await self._flush_async(name)
+
+    async def _flush_async(self, name):
+        async with self._flush_lock:
+            if name not in self._dirty:
+                return
+            keys = self._dirty.pop(name)
+            snapshot = self._snapshot(name, keys)
+            write = asyncio.ensure_future(asyncio.to_thread(self.backend.save, name, snapshot, keys))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+            try:
+                await asyncio.shield(write)
+            except Exception as e:
+                print(f"❌ Ошибка сохранения {name}: {e}")
+                self._mark_dirty(name, keys)
+                loop = asyncio.get_running_loop()
+                if name not in self._flush_tasks:
+                    self._flush_tasks[name] = loop.create_task(self._delayed_flush(name, 5))
+
+    async def flush(self):
+        """Принудительно сохраняет все отложенные изменения (вызывается при остановке)"""
+        for task in list(self._flush_tasks.values()):
+            task.cancel()
+        self._flush_tasks.clear()
+        # Начатые записи доводятся до конца: иначе старый снимок мог бы лечь поверх нового
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        for name in list(self._dirty):
+            await self._flush_async(name)
+
+    async def flush_collection(self, name):
+        """Сохраняет изменения коллекции сейчас, не дожидаясь окна STORAGE_FLUSH_DELAYS"""
+        task = self._flush_tasks.pop(name, None)
+        if task:
+            task.cancel()
+        await self._flush_async(name)
+
+    def save_accounts(self, *names):
+        self._save("accounts", names)
+
+    def save_targets(self, *target_ids):
+        self._save("targets", target_ids)
+
+    def save_scheduled(self, *msg_ids):
+        self._save("scheduled", msg_ids)
+
+    def save_drafts(self, *draft_ids):
+        self._save("drafts", draft_ids)
+
+    def save_stats(self, *account_names):
+        self._save("stats", account_names)
+
+    def save_rate_limits(self, *account_names):
+        self._save("rate_limits", account_names)
+
+    def save_peers(self, *account_names):
+        self._save("peers", account_names)
+
+    def save_stats_buckets(self, *series_keys):
+        self._save("stats_buckets", series_keys)
+
+    def save_meta(self, *keys):
+        self._save("meta", keys)
+
+    def save_jobs(self, *job_ids):
+        self._save("jobs", job_ids)
+
     def save_all(self):
         self.save_accounts()
         self.save_targets()
         self.save_scheduled()
         self.save_drafts()
         self.save_stats()
+        self.save_rate_limits()
+        self.save_peers()
+        self.save_stats_buckets()
+        self.save_meta()
+        self.save_jobs()
 
 storage = Storage()
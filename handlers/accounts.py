@@ -5,9 +5,40 @@ from states.states import AddAccount
 from keyboards.main_kb import cancel_kb, accounts_menu
 from utils.telethon_auth import start_auth, submit_code, submit_password, cancel_auth
 from database.storage import storage
+from utils.peer_cache import peer_cache
+from utils.pagination import Paginator, render_account_choice
+from utils.health import health
+from utils.shards import shard_manager
 
 router = Router()
 
+
+def _render_account(number, item):
+    name, acc = item
+    icon, label = health.describe(name)
+    phone = acc.get("phone", "нет номера")
+    shard = f" · шард {acc['client'].shard}" if acc["client"].remote else ""
+    return f"{number}. {icon} <b>{name}</b> - {label}{shard}\n 📞 {phone}\n\n"
+
+
+# Состояние аккаунтов меняется без сохранения, поэтому список не кэшируется
+accounts_pages = Paginator(
+    "accounts",
+    lambda: storage.accounts.items(),
+    _render_account,
+    header="📱 <b>Список аккаунтов:</b>\n\n",
+    parse_mode="HTML"
+)
+
+delete_account_pages = Paginator(
+    "delete_account",
+    lambda: storage.accounts.keys(),
+    render_account_choice,
+    header="Выберите номер аккаунта для удаления:\n\n",
+    footer="\nОтправьте номер:",
+    collections=("accounts",)
+)
+
 @router.message(F.text == "➕ Добавить аккаунт")
 async def add_account_start(message: Message, state: FSMContext):
     await state.set_state(AddAccount.waiting_session_name)
@@ -108,12 +139,7 @@ async def show_accounts(message: Message):
     if not storage.accounts:
         await message.answer("❌ Нет добавленных аккаунтов")
         return
-    text = "📱 <b>Список аккаунтов:</b>\n\n"
-    for i, (name, acc) in enumerate(storage.accounts.items(), 1):
-        status = "🟢" if acc["client"].is_connected() else "🔴"
-        phone = acc.get("phone", "нет номера")
-        text += f"{i}. {status} <b>{name}</b>\n 📞 {phone}\n\n"
-    await message.answer(text, parse_mode="HTML")
+    await accounts_pages.send(message)
 
 
 @router.message(F.text == "🗑 Удалить аккаунт")
@@ -122,11 +148,7 @@ async def delete_account_start(message: Message, state: FSMContext):
         await message.answer("❌ Нет аккаунтов для удаления")
         return
     await state.set_state(AddAccount.deleting_account)
-    text = "Выберите номер аккаунта для удаления:\n\n"
-    acc_list = list(storage.accounts.keys())
-    for i, name in enumerate(acc_list, 1):
-        text += f"{i}. {name}\n"
-    await message.answer(text + "\nОтправьте номер:", reply_markup=cancel_kb())
+    await delete_account_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(AddAccount.deleting_account, F.text.regexp(r'^\d+$'))
 async def process_account_deletion(message: Message, state: FSMContext):
@@ -140,12 +162,10 @@ async def process_account_deletion(message: Message, state: FSMContext):
                     await storage.accounts[name]["client"].disconnect()
                 except:
                     pass
-            for target in storage.targets.values():
-                if name in target.get("assigned_accounts", []):
-                    target["assigned_accounts"].remove(name)
-            del storage.accounts[name]
-            storage.save_accounts()
-            storage.save_targets()
+            shard_manager.detach(name)
+            storage.delete_account(name)
+            peer_cache.forget_account(name)
+            health.forget(name)
             await state.clear()
             await message.answer(f"✅ Аккаунт '{name}' удален!", reply_markup=accounts_menu())
         else:
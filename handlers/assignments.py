@@ -5,25 +5,50 @@ from aiogram.fsm.context import FSMContext
 from states.states import AssignAccount, RemoveAssignment
 from keyboards.main_kb import cancel_kb, assignments_menu
 from database.storage import storage
+from utils.pagination import Paginator, target_name, render_target_choice, render_account_choice
 
 router = Router()
 
+
+def _render_assigned_target(number, item):
+    target_id, data = item
+    if data["assigned_accounts"]:
+        return f"{number}. {target_name(data)} ({len(data['assigned_accounts'])})\n"
+    return f"{number}. {target_name(data)} (нет назначений)\n"
+
+
+assign_target_pages = Paginator(
+    "assign_target",
+    lambda: storage.targets.items(),
+    render_target_choice,
+    header="Выберите получателя:\n\n",
+    collections=("targets",)
+)
+
+assign_account_pages = Paginator(
+    "assign_account",
+    lambda: storage.accounts.keys(),
+    render_account_choice,
+    header="Выберите аккаунт:\n\n",
+    collections=("accounts",)
+)
+
+remove_target_pages = Paginator(
+    "remove_assignment",
+    lambda: storage.targets.items(),
+    _render_assigned_target,
+    header="Выберите получателя:\n\n",
+    collections=("targets",)
+)
+
 @router.message(F.text == "🔗 Назначить аккаунт")
 async def assign_account_start(message: Message, state: FSMContext):
     if not storage.targets or not storage.accounts:
         await message.answer("❌ Сначала добавьте аккаунты и получателей!")
         return
     
-    text = "Выберите получателя:\n\n"
-    target_list = list(storage.targets.items())
-    for i, (tid, data) in enumerate(target_list, 1):
-        if data["type"] == "user":
-            text += f"{i}. @{data['username']}\n"
-        else:
-            text += f"{i}. Группа {data['chat_id']}\n"
-    
     await state.set_state(AssignAccount.choosing_target)
-    await message.answer(text, reply_markup=cancel_kb())
+    await assign_target_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(AssignAccount.choosing_target, F.text.regexp(r'^\d+$'))
 async def process_assign_target(message: Message, state: FSMContext):
@@ -36,12 +61,7 @@ async def process_assign_target(message: Message, state: FSMContext):
             await state.update_data(target_id=target_id)
             await state.set_state(AssignAccount.choosing_account)
             
-            text = "Выберите аккаунт:\n\n"
-            acc_list = list(storage.accounts.keys())
-            for i, name in enumerate(acc_list, 1):
-                text += f"{i}. {name}\n"
-            
-            await message.answer(text)
+            await assign_account_pages.send(message)
     except:
         await message.answer("❌ Ошибка!")
 
@@ -57,9 +77,7 @@ async def process_assign_account(message: Message, state: FSMContext):
         if 0 <= idx < len(acc_list):
             acc_name = acc_list[idx]
             
-            if acc_name not in storage.targets[target_id]["assigned_accounts"]:
-                storage.targets[target_id]["assigned_accounts"].append(acc_name)
-                storage.save_targets()
+            if storage.assign_account(target_id, acc_name):
                 await message.answer(
                     f"✅ Аккаунт '{acc_name}' назначен!",
                     reply_markup=assignments_menu()
@@ -77,21 +95,8 @@ async def remove_assignment_start(message: Message, state: FSMContext):
         await message.answer("❌ Нет получателей!")
         return
     
-    text = "Выберите получателя:\n\n"
-    target_list = list(storage.targets.items())
-    for i, (tid, data) in enumerate(target_list, 1):
-        if data["type"] == "user":
-            text += f"{i}. @{data['username']}"
-        else:
-            text += f"{i}. Группа {data['chat_id']}"
-        
-        if data["assigned_accounts"]:
-            text += f" ({len(data['assigned_accounts'])})\n"
-        else:
-            text += " (нет назначений)\n"
-    
     await state.set_state(RemoveAssignment.choosing_target)
-    await message.answer(text, reply_markup=cancel_kb())
+    await remove_target_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(RemoveAssignment.choosing_target, F.text.regexp(r'^\d+$'))
 async def process_remove_target(message: Message, state: FSMContext):
@@ -129,8 +134,8 @@ async def process_remove_account(message: Message, state: FSMContext):
         assigned = storage.targets[target_id]["assigned_accounts"]
         
         if 0 <= idx < len(assigned):
-            removed = assigned.pop(idx)
-            storage.save_targets()
+            removed = assigned[idx]
+            storage.unassign_account(target_id, removed)
             await message.answer(
                 f"✅ Аккаунт '{removed}' удален из назначений!",
                 reply_markup=assignments_menu()
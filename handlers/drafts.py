@@ -4,13 +4,60 @@ from aiogram.fsm.context import FSMContext
 from states.states import CreateDraft, ConfigureDraft, SendDraft, DeleteDraft
 from keyboards.main_kb import cancel_kb, drafts_menu, main_menu, content_type_kb
 from database.storage import storage
-from utils.telethon_auth import send_telegram_message
-import random
-import asyncio
+from utils.pagination import Paginator, TYPE_EMOJI, render_target_choice, render_account_choice, render_draft_choice
+from utils.jobs import job_engine
 
 router = Router()
 
 
+def _render_draft(number, draft):
+    type_emoji = TYPE_EMOJI.get(draft.get("content_type", "text"), "💬")
+    return (
+        f"#{draft['id']} {type_emoji}: {draft['text'][:50] if draft.get('text') else '[Медиа]'}...\n"
+        f"Получатели: {len(draft['target_ids'])} | Аккаунты: {len(draft['accounts'])}\n\n"
+    )
+
+
+def _draft_picker(name, header, footer=""):
+    return Paginator(
+        name,
+        lambda: storage.drafts,
+        render_draft_choice,
+        header=header,
+        footer=footer,
+        collections=("drafts",)
+    )
+
+
+drafts_pages = Paginator(
+    "drafts",
+    lambda: storage.drafts,
+    _render_draft,
+    header="📝 <b>Черновики:</b>\n\n",
+    collections=("drafts",),
+    parse_mode="HTML"
+)
+configure_draft_pages = _draft_picker("configure_draft", "Выберите черновик для настройки:\n\n")
+send_draft_pages = _draft_picker("send_draft", "Выберите черновик для отправки:\n\n")
+delete_draft_pages = _draft_picker("delete_draft", "Выберите черновик для удаления:\n\n", "\nОтправьте номер черновика:")
+
+draft_targets_pages = Paginator(
+    "draft_targets",
+    lambda: storage.targets.items(),
+    render_target_choice,
+    header="Выберите получателей (номера через запятую или 'all'):\n\n",
+    collections=("targets",)
+)
+
+draft_accounts_pages = Paginator(
+    "draft_accounts",
+    lambda: storage.accounts.keys(),
+    render_account_choice,
+    header="Выберите аккаунты (номера через запятую или 'all'):\n\n",
+    collections=("accounts",)
+)
+
+
 @router.message(F.text == "➕ Создать черновик")
 async def create_draft_start(message: Message, state: FSMContext):
     await state.set_state(CreateDraft.waiting_content_type)
@@ -58,15 +105,12 @@ async def process_draft_text(message: Message, state: FSMContext):
     else:
         text = message.text
     
-    draft = {
-        "id": len(storage.drafts) + 1,
+    draft = storage.drafts.create({
         "text": text,
         "content_type": data.get("content_type", "text"),
         "target_ids": [],
         "accounts": []
-    }
-    storage.drafts.append(draft)
-    storage.save_drafts()
+    })
     await state.clear()
     await message.answer(f"✅ Черновик #{draft['id']} создан!", reply_markup=drafts_menu())
 
@@ -82,27 +126,29 @@ async def process_draft_media(message: Message, state: FSMContext):
     caption = message.caption or ""
     
     file_id = None
+    file_unique_id = None
     if content_type == "photo" and message.photo:
         file_id = message.photo[-1].file_id
+        file_unique_id = message.photo[-1].file_unique_id
     elif content_type == "video" and message.video:
         file_id = message.video.file_id
+        file_unique_id = message.video.file_unique_id
     elif content_type == "document" and message.document:
         file_id = message.document.file_id
+        file_unique_id = message.document.file_unique_id
     
     if not file_id:
         await message.answer("❌ Не удалось получить медиа! Попробуйте снова:")
         return
     
-    draft = {
-        "id": len(storage.drafts) + 1,
+    draft = storage.drafts.create({
         "text": caption,
         "content_type": content_type,
         "file_id": file_id,
+        "file_unique_id": file_unique_id,
         "target_ids": [],
         "accounts": []
-    }
-    storage.drafts.append(draft)
-    storage.save_drafts()
+    })
     await state.clear()
     await message.answer(f"✅ Черновик #{draft['id']} создан!", reply_markup=drafts_menu())
 
@@ -113,13 +159,7 @@ async def show_drafts(message: Message):
         await message.answer("❌ Нет черновиков")
         return
     
-    text = "📝 <b>Черновики:</b>\n\n"
-    for draft in storage.drafts:
-        type_emoji = {"text": "💬", "photo": "🖼", "video": "🎥", "document": "📎"}.get(draft.get("content_type", "text"), "💬")
-        text += f"#{draft['id']} {type_emoji}: {draft['text'][:50] if draft.get('text') else '[Медиа]'}...\n"
-        text += f"Получатели: {len(draft['target_ids'])} | Аккаунты: {len(draft['accounts'])}\n\n"
-    
-    await message.answer(text, parse_mode="HTML")
+    await drafts_pages.send(message)
 
 
 @router.message(F.text == "⚙️ Настроить черновик")
@@ -128,12 +168,8 @@ async def configure_draft_start(message: Message, state: FSMContext):
         await message.answer("❌ Нет черновиков")
         return
     
-    text = "Выберите черновик для настройки:\n\n"
-    for draft in storage.drafts:
-        text += f"{draft['id']}. {draft['text'][:40] if draft.get('text') else '[Медиа]'}...\n"
-    
     await state.set_state(ConfigureDraft.choosing_draft)
-    await message.answer(text, reply_markup=cancel_kb())
+    await configure_draft_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(ConfigureDraft.choosing_draft, F.text == "❌ Отмена")
 async def cancel_configure_draft(message: Message, state: FSMContext):
@@ -144,7 +180,7 @@ async def cancel_configure_draft(message: Message, state: FSMContext):
 async def process_draft_choice(message: Message, state: FSMContext):
     try:
         draft_id = int(message.text)
-        draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
+        draft = storage.drafts.get(draft_id)
         if not draft:
             await message.answer("❌ Черновик не найден!")
             return
@@ -167,27 +203,17 @@ async def cancel_configure_action(message: Message, state: FSMContext):
 async def process_config_action(message: Message, state: FSMContext):
     data = await state.get_data()
     draft_id = data["draft_id"]
-    draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
+    draft = storage.drafts.get(draft_id)
 
     if message.text == "1":
-        text = "Выберите получателей (номера через запятую или 'all'):\n\n"
-        for i, tid in enumerate(storage.targets.keys(), 1):
-            target_data = storage.targets[tid]
-            name = target_data.get('username', target_data.get('chat_id'))
-            text += f"{i}. {name}\n"
-        
         await state.update_data(config_type="targets")
         await state.set_state(ConfigureDraft.selecting_targets)
-        await message.answer(text, reply_markup=cancel_kb())
+        await draft_targets_pages.send(message, reply_markup=cancel_kb())
     
     else:
-        text = "Выберите аккаунты (номера через запятую или 'all'):\n\n"
-        for i, name in enumerate(storage.accounts.keys(), 1):
-            text += f"{i}. {name}\n"
-        
         await state.update_data(config_type="accounts")
         await state.set_state(ConfigureDraft.selecting_accounts)
-        await message.answer(text, reply_markup=cancel_kb())
+        await draft_accounts_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(ConfigureDraft.selecting_targets, F.text == "❌ Отмена")
 async def cancel_select_targets(message: Message, state: FSMContext):
@@ -198,21 +224,24 @@ async def cancel_select_targets(message: Message, state: FSMContext):
 async def process_targets_selection(message: Message, state: FSMContext):
     data = await state.get_data()
     draft_id = data["draft_id"]
-    draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
     
     target_list = list(storage.targets.keys())
     
     if message.text.lower() == "all":
-        draft["target_ids"] = target_list.copy()
+        target_ids = target_list.copy()
     else:
         try:
             indices = [int(x.strip()) - 1 for x in message.text.split(',') if x.strip().isdigit()]
-            draft["target_ids"] = [target_list[i] for i in indices if 0 <= i < len(target_list)]
+            target_ids = [target_list[i] for i in indices if 0 <= i < len(target_list)]
         except:
             await message.answer("❌ Неверный ввод! Попробуйте снова:")
             return
     
-    storage.save_drafts()
+    draft = storage.drafts.update(draft_id, target_ids=target_ids)
+    if not draft:
+        await state.clear()
+        await message.answer("❌ Черновик не найден!", reply_markup=drafts_menu())
+        return
     await state.clear()
     await message.answer(f"✅ Получатели настроены ({len(draft['target_ids'])})", reply_markup=drafts_menu())
 
@@ -225,21 +254,24 @@ async def cancel_select_accounts(message: Message, state: FSMContext):
 async def process_accounts_selection(message: Message, state: FSMContext):
     data = await state.get_data()
     draft_id = data["draft_id"]
-    draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
     
     acc_list = list(storage.accounts.keys())
     
     if message.text.lower() == "all":
-        draft["accounts"] = acc_list.copy()
+        accounts = acc_list.copy()
     else:
         try:
             indices = [int(x.strip()) - 1 for x in message.text.split(',') if x.strip().isdigit()]
-            draft["accounts"] = [acc_list[i] for i in indices if 0 <= i < len(acc_list)]
+            accounts = [acc_list[i] for i in indices if 0 <= i < len(acc_list)]
         except:
             await message.answer("❌ Неверный ввод! Попробуйте снова:")
             return
     
-    storage.save_drafts()
+    draft = storage.drafts.update(draft_id, accounts=accounts)
+    if not draft:
+        await state.clear()
+        await message.answer("❌ Черновик не найден!", reply_markup=drafts_menu())
+        return
     await state.clear()
     await message.answer(f"✅ Аккаунты настроены ({len(draft['accounts'])})", reply_markup=drafts_menu())
 
@@ -250,12 +282,8 @@ async def send_draft_start(message: Message, state: FSMContext):
         await message.answer("❌ Нет черновиков")
         return
     
-    text = "Выберите черновик для отправки:\n\n"
-    for draft in storage.drafts:
-        text += f"{draft['id']}. {draft['text'][:40] if draft.get('text') else '[Медиа]'}...\n"
-    
     await state.set_state(SendDraft.choosing_draft)
-    await message.answer(text, reply_markup=cancel_kb())
+    await send_draft_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(SendDraft.choosing_draft, F.text == "❌ Отмена")
 async def cancel_send_draft(message: Message, state: FSMContext):
@@ -266,7 +294,7 @@ async def cancel_send_draft(message: Message, state: FSMContext):
 async def process_draft_send(message: Message, state: FSMContext):
     try:
         draft_id = int(message.text)
-        draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
+        draft = storage.drafts.get(draft_id)
         if not draft:
             await message.answer("❌ Черновик не найден!")
             return
@@ -297,34 +325,22 @@ async def cancel_draft_send_mode(message: Message, state: FSMContext):
 async def process_draft_send_mode(message: Message, state: FSMContext):
     data = await state.get_data()
     draft_id = data["draft_id"]
-    draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
+    draft = storage.drafts.get(draft_id)
     
     if message.text == "1":
-        await message.answer("📤 Отправка черновика...")
-        
-        total_sent = 0
-        for target_id in draft["target_ids"]:
-            if target_id in storage.targets:
-                target_data = storage.targets[target_id]
-                assigned = draft["accounts"] or target_data.get("assigned_accounts", [])
-                if not assigned:
-                    assigned = [random.choice(list(storage.accounts.keys()))] if storage.accounts else []
-                
-                for acc_name in assigned:
-                    if acc_name in storage.accounts:
-                        client = storage.accounts[acc_name]["client"]
-                        success = await send_telegram_message(
-                            client, target_data, draft.get("text", ""), acc_name,
-                            media_type=draft.get("content_type", "text"),
-                            file_id=draft.get("file_id"),
-                            bot=message.bot
-                        )
-                        if success:
-                            total_sent += 1
-                        await asyncio.sleep(2)
+        progress = await message.answer("📤 Отправка черновика...")
+        job_engine.create(
+            draft["target_ids"], draft.get("text", ""), 0,
+            media_type=draft.get("content_type", "text"),
+            file_id=draft.get("file_id"),
+            file_unique_id=draft.get("file_unique_id"),
+            accounts=draft["accounts"],
+            title=f"Черновик #{draft_id}",
+            progress_message=progress
+        )
         
         await state.clear()
-        await message.answer(f"✅ Черновик отправлен! Успешно: {total_sent}", reply_markup=drafts_menu())
+        await message.answer("⏳ Черновик отправляется в фоне, прогресс - в сообщении выше", reply_markup=drafts_menu())
     else:
         await state.set_state(SendDraft.waiting_interval)
         await message.answer(
@@ -352,7 +368,7 @@ async def process_draft_interval(message: Message, state: FSMContext):
         
         data = await state.get_data()
         draft_id = data["draft_id"]
-        draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
+        draft = storage.drafts.get(draft_id)
         
         await state.clear()
         await message.answer(
@@ -362,7 +378,14 @@ async def process_draft_interval(message: Message, state: FSMContext):
             f"Сообщения отправляются в фоне...",
             reply_markup=drafts_menu()
         )
-        asyncio.create_task(send_draft_with_interval(draft, interval, message.bot))
+        job_engine.create(
+            draft["target_ids"], draft.get("text", ""), interval,
+            media_type=draft.get("content_type", "text"),
+            file_id=draft.get("file_id"),
+            file_unique_id=draft.get("file_unique_id"),
+            accounts=draft["accounts"],
+            title=f"Черновик #{draft_id}"
+        )
     except:
         await message.answer("❌ Введите число в секундах! Попробуйте снова:")
 
@@ -372,12 +395,8 @@ async def delete_draft_start(message: Message, state: FSMContext):
         await message.answer("❌ Нет черновиков")
         return
     
-    text = "Выберите черновик для удаления:\n\n"
-    for draft in storage.drafts:
-        text += f"{draft['id']}. {draft['text'][:40] if draft.get('text') else '[Медиа]'}...\n"
-    
     await state.set_state(DeleteDraft.choosing_draft)
-    await message.answer(text + "\nОтправьте номер черновика:", reply_markup=cancel_kb())
+    await delete_draft_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(DeleteDraft.choosing_draft, F.text == "❌ Отмена")
 async def cancel_delete_draft(message: Message, state: FSMContext):
@@ -388,35 +407,10 @@ async def cancel_delete_draft(message: Message, state: FSMContext):
 async def process_delete_draft(message: Message, state: FSMContext):
     try:
         draft_id = int(message.text)
-        draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
-        if draft:
-            storage.drafts.remove(draft)
-            storage.save_drafts()
+        if storage.drafts.delete(draft_id):
             await state.clear()
             await message.answer(f"✅ Черновик #{draft_id} удалён!", reply_markup=drafts_menu())
         else:
             await message.answer("❌ Черновик не найден")
     except:
         await message.answer("❌ Ошибка ввода!")
-
-async def send_draft_with_interval(draft, interval, bot):
-    """Отправляет черновик по очереди с интервалом"""
-    for idx, target_id in enumerate(draft["target_ids"]):
-        if target_id in storage.targets:
-            target_data = storage.targets[target_id]
-            assigned = draft["accounts"] or target_data.get("assigned_accounts", [])
-            if not assigned:
-                assigned = [random.choice(list(storage.accounts.keys()))] if storage.accounts else []
-            
-            for acc_name in assigned:
-                if acc_name in storage.accounts:
-                    client = storage.accounts[acc_name]["client"]
-                    await send_telegram_message(
-                        client, target_data, draft.get("text", ""), acc_name,
-                        media_type=draft.get("content_type", "text"),
-                        file_id=draft.get("file_id"),
-                        bot=bot
-                    )
-        
-        if idx < len(draft["target_ids"]) - 1:
-            await asyncio.sleep(interval)
@@ -0,0 +1,97 @@
+# handlers/jobs.py
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from handlers.start import check_access
+from utils.jobs import job_engine, progress_bar
+from utils.send_queue import send_queue
+import html
+
+router = Router()
+
+# Сколько рассылок показывать в одном сообщении (у каждой своя строка кнопок)
+JOBS_VIEW_LIMIT = 10
+
+def render_jobs():
+    """Текст и кнопки списка рассылок"""
+    jobs = job_engine.jobs()
+    if not jobs:
+        return "📨 Нет активных рассылок", None
+
+    text = f"📨 <b>Рассылки ({len(jobs)}):</b>\n\n"
+    buttons = []
+    for idx, job in enumerate(jobs[:JOBS_VIEW_LIMIT], 1):
+        progress = job_engine.progress(job)
+        total = len(job["target_ids"])
+        paused = job.get("status", "active") == "paused"
+
+        icon = "⏸" if paused else ("📤" if job_engine.is_running(job["id"]) else "▶️")
+        text += f"{idx}. {icon} <b>{html.escape(job.get('title') or 'Рассылка')}</b> <code>{job['id'][:8]}</code>\n"
+        processed = total - progress["remaining"]
+        text += f"{progress_bar(processed, total)} {processed}/{total}\n"
+        text += f"✅ {progress['sent']}  ❌ {progress['failed']}  ⏳ осталось {progress['remaining']}\n"
+        interval = f"Интервал: {job['interval']} сек" if job["interval"] else "Без интервала"
+        if paused:
+            text += f"{interval}, на паузе\n\n"
+        elif progress["eta"] is None:
+            # Все получатели уже в отправке - ждём последние результаты
+            text += f"{interval}, завершается\n\n"
+        else:
+            text += f"{interval}, окончание ≈ {progress['eta']:%d.%m %H:%M}\n\n"
+
+        buttons.append([
+            InlineKeyboardButton(
+                text=f"▶️ {idx}" if paused else f"⏸ {idx}",
+                callback_data=f"job:{'resume' if paused else 'pause'}:{job['id']}"
+            ),
+            InlineKeyboardButton(text=f"🛑 {idx}", callback_data=f"job:cancel:{job['id']}"),
+        ])
+
+    if len(jobs) > JOBS_VIEW_LIMIT:
+        text += f"... и ещё {len(jobs) - JOBS_VIEW_LIMIT}\n"
+    pending = send_queue.pending()
+    if any(pending.values()):
+        text += (
+            f"📥 В очереди отправки: срочные {pending['interactive']}, "
+            f"запланированные {pending['scheduled']}, рассылки {pending['bulk']}\n"
+        )
+    buttons.append([InlineKeyboardButton(text="🔄 Обновить", callback_data="job:refresh")])
+    return text, InlineKeyboardMarkup(inline_keyboard=buttons)
+
+@router.message(F.text == "📨 Рассылки")
+async def show_jobs(message: Message, state: FSMContext):
+    if not check_access(message.from_user.id):
+        await message.answer("❌ У вас нет доступа к этому боту")
+        return
+    await state.clear()
+    text, markup = render_jobs()
+    await message.answer(text, reply_markup=markup, parse_mode="HTML")
+
+@router.callback_query(F.data.startswith("job:"))
+async def job_action(callback: CallbackQuery):
+    """Кнопки рассылок: callback_data вида job:<действие>[:<id>]"""
+    if not check_access(callback.from_user.id):
+        await callback.answer("❌ Нет доступа")
+        return
+
+    _, action, *rest = callback.data.split(":")
+    job_id = rest[0] if rest else None
+    actions = {
+        "pause": (job_engine.pause, "⏸ Рассылка приостановлена"),
+        "resume": (job_engine.resume, "▶️ Рассылка продолжена"),
+        "cancel": (job_engine.cancel, "🛑 Рассылка отменена"),
+    }
+    notice = None
+    if action in actions:
+        handler, notice = actions[action]
+        if handler(job_id) is None:
+            notice = "❌ Рассылка уже завершена или изменена"
+
+    text, markup = render_jobs()
+    try:
+        await callback.message.edit_text(text, reply_markup=markup, parse_mode="HTML")
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer(notice)
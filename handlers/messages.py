@@ -5,12 +5,21 @@ from aiogram.fsm.context import FSMContext
 from states.states import SendMessage
 from keyboards.main_kb import cancel_kb, main_menu, content_type_kb
 from database.storage import storage
-from utils.telethon_auth import send_telegram_message
-import random
-import asyncio
+from utils.pagination import Paginator, render_target_choice
+from utils.jobs import job_engine
 
 router = Router()
 
+
+targets_pages = Paginator(
+    "send_targets",
+    lambda: storage.targets.items(),
+    render_target_choice,
+    header="Выберите получателей (номера через запятую или 'all'):\n\n",
+    footer="\nПример: 1,3,5 или all",
+    collections=("targets",)
+)
+
 @router.message(F.text == "✉️ Отправить")
 async def send_message_start(message: Message, state: FSMContext):
     if not storage.targets:
@@ -23,16 +32,7 @@ async def send_message_start(message: Message, state: FSMContext):
     
     await state.set_state(SendMessage.choosing_targets)
     
-    text = "Выберите получателей (номера через запятую или 'all'):\n\n"
-    target_list = list(storage.targets.items())
-    for i, (tid, data) in enumerate(target_list, 1):
-        if data["type"] == "user":
-            text += f"{i}. @{data['username']}\n"
-        else:
-            text += f"{i}. Группа {data['chat_id']}\n"
-    
-    text += "\nПример: 1,3,5 или all"
-    await message.answer(text, reply_markup=cancel_kb())
+    await targets_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(SendMessage.choosing_targets, F.text == "❌ Отмена")
 async def cancel_targets(message: Message, state: FSMContext):
@@ -157,29 +157,10 @@ async def process_message_text(message: Message, state: FSMContext):
     await state.clear()
     
     if send_mode == "instant":
-        await message.answer(f"📤 Отправка {len(target_ids)} получателям...")
-        success_count = 0
-        for target_id in target_ids:
-            if target_id in storage.targets:
-                target_data = storage.targets[target_id]
-                assigned = target_data.get("assigned_accounts", []).copy()
-                
-                if not assigned:
-                    assigned = [random.choice(list(storage.accounts.keys()))] if storage.accounts else []
-                
-                for acc_name in assigned:
-                    if acc_name in storage.accounts:
-                        client = storage.accounts[acc_name]["client"]
-                        success = await send_telegram_message(
-                            client, target_data, text, acc_name, 
-                            media_type="text", bot=message.bot
-                        )
-                        if success:
-                            success_count += 1
-                        await asyncio.sleep(2)
-        
+        progress = await message.answer(f"📤 Отправка {len(target_ids)} получателям...")
+        job_engine.create(target_ids, text, 0, title="Сообщение", progress_message=progress)
         await message.answer(
-            f"✅ Готово! Отправлено: {success_count}",
+            "⏳ Сообщения отправляются в фоне, прогресс - в сообщении выше",
             reply_markup=main_menu()
         )
     else:
@@ -191,7 +172,7 @@ async def process_message_text(message: Message, state: FSMContext):
             f"Сообщения отправляются в фоне...",
             reply_markup=main_menu()
         )
-        asyncio.create_task(send_with_interval(target_ids, text, interval, "text", None, message.bot))
+        job_engine.create(target_ids, text, interval, title="Сообщение")
 
 @router.message(SendMessage.waiting_media, F.text == "❌ Отмена")
 async def cancel_media(message: Message, state: FSMContext):
@@ -207,12 +188,16 @@ async def process_message_media(message: Message, state: FSMContext):
     caption = message.caption or ""
     
     file_id = None
+    file_unique_id = None
     if content_type == "photo" and message.photo:
         file_id = message.photo[-1].file_id
+        file_unique_id = message.photo[-1].file_unique_id
     elif content_type == "video" and message.video:
         file_id = message.video.file_id
+        file_unique_id = message.video.file_unique_id
     elif content_type == "document" and message.document:
         file_id = message.document.file_id
+        file_unique_id = message.document.file_unique_id
     
     if not file_id:
         await message.answer("❌ Не удалось получить медиа! Попробуйте снова:")
@@ -221,29 +206,14 @@ async def process_message_media(message: Message, state: FSMContext):
     await state.clear()
     
     if send_mode == "instant":
-        await message.answer(f"📤 Отправка {len(target_ids)} получателям...")
-        success_count = 0
-        for target_id in target_ids:
-            if target_id in storage.targets:
-                target_data = storage.targets[target_id]
-                assigned = target_data.get("assigned_accounts", []).copy()
-                
-                if not assigned:
-                    assigned = [random.choice(list(storage.accounts.keys()))] if storage.accounts else []
-                
-                for acc_name in assigned:
-                    if acc_name in storage.accounts:
-                        client = storage.accounts[acc_name]["client"]
-                        success = await send_telegram_message(
-                            client, target_data, caption, acc_name,
-                            media_type=content_type, file_id=file_id, bot=message.bot
-                        )
-                        if success:
-                            success_count += 1
-                        await asyncio.sleep(2)
-        
+        progress = await message.answer(f"📤 Отправка {len(target_ids)} получателям...")
+        job_engine.create(
+            target_ids, caption, 0,
+            media_type=content_type, file_id=file_id, file_unique_id=file_unique_id,
+            title="Сообщение", progress_message=progress
+        )
         await message.answer(
-            f"✅ Готово! Отправлено: {success_count}",
+            "⏳ Сообщения отправляются в фоне, прогресс - в сообщении выше",
             reply_markup=main_menu()
         )
     else:
@@ -255,25 +225,8 @@ async def process_message_media(message: Message, state: FSMContext):
             f"Сообщения отправляются в фоне...",
             reply_markup=main_menu()
         )
-        asyncio.create_task(send_with_interval(target_ids, caption, interval, content_type, file_id, message.bot))
-
-async def send_with_interval(target_ids, text, interval, media_type, file_id, bot):
-    """Отправляет сообщения по очереди с интервалом"""
-    for idx, target_id in enumerate(target_ids):
-        if target_id in storage.targets:
-            target_data = storage.targets[target_id]
-            assigned = target_data.get("assigned_accounts", []).copy()
-            
-            if not assigned:
-                assigned = [random.choice(list(storage.accounts.keys()))] if storage.accounts else []
-            
-            for acc_name in assigned:
-                if acc_name in storage.accounts:
-                    client = storage.accounts[acc_name]["client"]
-                    await send_telegram_message(
-                        client, target_data, text, acc_name,
-                        media_type=media_type, file_id=file_id, bot=bot
-                    )
-            
-            if idx < len(target_ids) - 1:
-                await asyncio.sleep(interval)
+        job_engine.create(
+            target_ids, caption, interval,
+            media_type=content_type, file_id=file_id, file_unique_id=file_unique_id,
+            title="Сообщение"
+        )
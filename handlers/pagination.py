@@ -0,0 +1,25 @@
+# handlers/pagination.py
+from aiogram import Router, F
+from aiogram.types import CallbackQuery
+from utils.pagination import paginators, CALLBACK_PREFIX
+from handlers.start import check_access
+
+router = Router()
+
+@router.callback_query(F.data.startswith(f"{CALLBACK_PREFIX}:"))
+async def turn_page(callback: CallbackQuery):
+    """Листание списков: callback_data вида page:<список>:<страница>"""
+    if not check_access(callback.from_user.id):
+        await callback.answer("❌ Нет доступа")
+        return
+
+    try:
+        _, name, page = callback.data.split(":")
+        paginator = paginators[name]
+        page = int(page)
+    except (ValueError, KeyError):
+        await callback.answer("❌ Список устарел")
+        return
+
+    await paginator.show(callback.message, page)
+    await callback.answer()
@@ -4,28 +4,84 @@ from aiogram.fsm.context import FSMContext
 from states.states import ScheduleMessage, DeleteScheduled
 from keyboards.main_kb import cancel_kb, scheduler_menu, content_type_kb
 from database.storage import storage
+from utils.schedule_queue import schedule_queue
+from utils.pagination import Paginator, TYPE_EMOJI, render_target_choice, render_draft_choice
 from datetime import datetime, timedelta
 
 router = Router()
 
 
+def _scheduled_line(msg, time_format):
+    server_time = datetime.strptime(msg['time'], "%Y-%m-%d %H:%M:%S")
+    user_time = server_time + timedelta(hours=2)
+
+    target_data = storage.targets.get(msg["target_id"], {})
+    name = target_data.get('username', target_data.get('chat_id', 'неизвестно'))
+    if target_data.get("type") == "user":
+        name = f"@{name}"
+    return user_time.strftime(time_format), name
+
+
+def _render_scheduled(number, msg):
+    user_time, name = _scheduled_line(msg, '%d.%m.%Y %H:%M')
+    type_emoji = TYPE_EMOJI.get(msg.get("content_type", "text"), "💬")
+
+    line = f"{number}. {type_emoji} {user_time} → {name}\n"
+    if msg.get('text'):
+        return line + f"   {msg['text'][:40]}...\n\n"
+    return line + "\n"
+
+
+def _render_scheduled_choice(number, msg):
+    user_time, name = _scheduled_line(msg, '%d.%m %H:%M')
+    return f"{number}. {user_time} → {name}\n"
+
+
+targets_pages = Paginator(
+    "schedule_targets",
+    lambda: storage.targets.items(),
+    render_target_choice,
+    header="Выберите получателей (номера через запятую или 'all'):\n\n",
+    footer="\nПример: 1,3,5 или all",
+    collections=("targets",)
+)
+
+drafts_pages = Paginator(
+    "schedule_draft",
+    lambda: storage.drafts,
+    render_draft_choice,
+    header="Выберите черновик (номер или название):\n\n",
+    collections=("drafts",)
+)
+
+# Имя получателя берётся из targets, поэтому кэш зависит и от них
+scheduled_pages = Paginator(
+    "scheduled",
+    lambda: storage.scheduled_messages,
+    _render_scheduled,
+    header="⏰ <b>Запланированные сообщения:</b>\n\n",
+    collections=("scheduled", "targets"),
+    parse_mode="HTML"
+)
+
+delete_scheduled_pages = Paginator(
+    "delete_scheduled",
+    lambda: storage.scheduled_messages,
+    _render_scheduled_choice,
+    header="Выберите номер для удаления:\n\n",
+    footer="\n💡 Можно:\n• Один номер: 3\n• Несколько: 1,3,5\n• Все: all",
+    collections=("scheduled", "targets")
+)
+
+
 @router.message(F.text == "➕ Запланировать")
 async def schedule_start(message: Message, state: FSMContext):
     if not storage.targets:
         await message.answer("❌ Сначала добавьте получателей!")
         return
     
-    text = "Выберите получателей (номера через запятую или 'all'):\n\n"
-    target_list = list(storage.targets.items())
-    for i, (tid, data) in enumerate(target_list, 1):
-        if data["type"] == "user":
-            text += f"{i}. @{data['username']}\n"
-        else:
-            text += f"{i}. Группа {data['chat_id']}\n"
-    
-    text += "\nПример: 1,3,5 или all"
     await state.set_state(ScheduleMessage.choosing_targets)
-    await message.answer(text, reply_markup=cancel_kb())
+    await targets_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(ScheduleMessage.choosing_targets, F.text == "❌ Отмена")
 async def cancel_targets_choice(message: Message, state: FSMContext):
@@ -77,12 +133,8 @@ async def process_schedule_source(message: Message, state: FSMContext):
             await state.set_state(ScheduleMessage.waiting_content_type)
             return
         
-        text = "Выберите черновик (номер или название):\n\n"
-        for draft in storage.drafts:
-            text += f"{draft['id']}. {draft['text'][:40] if draft.get('text') else '[Медиа]'}...\n"
-        
         await state.set_state(ScheduleMessage.choosing_draft)
-        await message.answer(text, reply_markup=cancel_kb())
+        await drafts_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(ScheduleMessage.choosing_draft, F.text == "❌ Отмена")
 async def cancel_draft_choice(message: Message, state: FSMContext):
@@ -93,7 +145,7 @@ async def cancel_draft_choice(message: Message, state: FSMContext):
 async def process_draft_selection(message: Message, state: FSMContext):
     try:
         draft_id = int(message.text)
-        draft = next((d for d in storage.drafts if d["id"] == draft_id), None)
+        draft = storage.drafts.get(draft_id)
         if not draft:
             await message.answer("❌ Черновик не найден! Попробуйте снова:")
             return
@@ -101,7 +153,8 @@ async def process_draft_selection(message: Message, state: FSMContext):
         await state.update_data(
             text=draft.get("text", ""),
             content_type=draft.get("content_type", "text"),
-            file_id=draft.get("file_id")
+            file_id=draft.get("file_id"),
+            file_unique_id=draft.get("file_unique_id")
         )
         
         await state.set_state(ScheduleMessage.waiting_time)
@@ -188,18 +241,22 @@ async def process_schedule_media(message: Message, state: FSMContext):
     caption = message.caption or ""
     
     file_id = None
+    file_unique_id = None
     if content_type == "photo" and message.photo:
         file_id = message.photo[-1].file_id
+        file_unique_id = message.photo[-1].file_unique_id
     elif content_type == "video" and message.video:
         file_id = message.video.file_id
+        file_unique_id = message.video.file_unique_id
     elif content_type == "document" and message.document:
         file_id = message.document.file_id
+        file_unique_id = message.document.file_unique_id
     
     if not file_id:
         await message.answer("❌ Не удалось получить медиа! Попробуйте снова:")
         return
     
-    await state.update_data(file_id=file_id, text=caption)
+    await state.update_data(file_id=file_id, file_unique_id=file_unique_id, text=caption)
     await state.set_state(ScheduleMessage.waiting_time)
     
     now = datetime.now() + timedelta(hours=2)
@@ -258,12 +315,15 @@ async def process_schedule_time(message: Message, state: FSMContext):
         text = data.get("text", "")
         content_type = data.get("content_type", "text")
         file_id = data.get("file_id")
+        file_unique_id = data.get("file_unique_id")
         
+        new_messages = []
         for target_id in target_ids:
             if target_id in storage.targets:
                 assigned = storage.targets[target_id].get("assigned_accounts", []).copy()
                 
                 msg_data = {
+                    "id": storage.new_scheduled_id(),
                     "time": send_time.strftime("%Y-%m-%d %H:%M:%S"),
                     "target_id": target_id,
                     "text": text,
@@ -273,10 +333,14 @@ async def process_schedule_time(message: Message, state: FSMContext):
                 
                 if file_id:
                     msg_data["file_id"] = file_id
+                    if file_unique_id:
+                        msg_data["file_unique_id"] = file_unique_id
                 
-                storage.scheduled_messages.append(msg_data)
+                new_messages.append(msg_data)
         
-        storage.save_scheduled()
+        storage.add_scheduled(*new_messages)
+        for msg_data in new_messages:
+            schedule_queue.add(msg_data)
         
         user_display_time = send_time + timedelta(hours=2)
         
@@ -310,26 +374,7 @@ async def show_scheduled(message: Message):
         await message.answer("❌ Нет запланированных сообщений")
         return
     
-    text = "⏰ <b>Запланированные сообщения:</b>\n\n"
-    for i, msg in enumerate(storage.scheduled_messages, 1):
-        server_time = datetime.strptime(msg['time'], "%Y-%m-%d %H:%M:%S")
-        user_time = server_time + timedelta(hours=2)
-        
-        target_data = storage.targets.get(msg["target_id"], {})
-        name = target_data.get('username', target_data.get('chat_id', 'неизвестно'))
-        if target_data.get("type") == "user":
-            name = f"@{name}"
-        
-        content_type = msg.get("content_type", "text")
-        type_emoji = {"text": "💬", "photo": "🖼", "video": "🎥", "document": "📎"}.get(content_type, "💬")
-        
-        text += f"{i}. {type_emoji} {user_time.strftime('%d.%m.%Y %H:%M')} → {name}\n"
-        if msg.get('text'):
-            text += f"   {msg['text'][:40]}...\n\n"
-        else:
-            text += "\n"
-    
-    await message.answer(text, parse_mode="HTML")
+    await scheduled_pages.send(message)
 
 
 @router.message(F.text == "🗑 Удалить запланированное")
@@ -338,25 +383,8 @@ async def delete_scheduled_start(message: Message, state: FSMContext):
         await message.answer("❌ Нет запланированных сообщений")
         return
     
-    text = "Выберите номер для удаления:\n\n"
-    for i, msg in enumerate(storage.scheduled_messages, 1):
-        server_time = datetime.strptime(msg['time'], "%Y-%m-%d %H:%M:%S")
-        user_time = server_time + timedelta(hours=2)
-        
-        target_data = storage.targets.get(msg["target_id"], {})
-        name = target_data.get('username', target_data.get('chat_id', 'неизвестно'))
-        if target_data.get("type") == "user":
-            name = f"@{name}"
-        
-        text += f"{i}. {user_time.strftime('%d.%m %H:%M')} → {name}\n"
-    
-    text += "\n💡 Можно:\n"
-    text += "• Один номер: 3\n"
-    text += "• Несколько: 1,3,5\n"
-    text += "• Все: all"
-    
     await state.set_state(DeleteScheduled.choosing_message)
-    await message.answer(text, reply_markup=cancel_kb())
+    await delete_scheduled_pages.send(message, reply_markup=cancel_kb())
 
 @router.message(DeleteScheduled.choosing_message, F.text == "❌ Отмена")
 async def cancel_deletion(message: Message, state: FSMContext):
@@ -370,8 +398,8 @@ async def process_scheduled_deletion(message: Message, state: FSMContext):
         
         if text == "all":
             count = len(storage.scheduled_messages)
-            storage.scheduled_messages.clear()
-            storage.save_scheduled()
+            storage.remove_scheduled(storage.scheduled_messages)
+            schedule_queue.clear()
             await state.clear()
             await message.answer(
                 f"✅ Удалено {count} запланированных сообщений!",
@@ -384,15 +412,14 @@ async def process_scheduled_deletion(message: Message, state: FSMContext):
                 await message.answer("❌ Неверный формат! Используйте: 1,3,5 или all")
                 return
             
-            indices.sort(reverse=True)
-            
-            removed_count = 0
-            for idx in indices:
-                if 0 <= idx < len(storage.scheduled_messages):
-                    storage.scheduled_messages.pop(idx)
-                    removed_count += 1
-            
-            storage.save_scheduled()
+            removed = [
+                storage.scheduled_messages[idx] for idx in set(indices)
+                if 0 <= idx < len(storage.scheduled_messages)
+            ]
+            for msg in removed:
+                schedule_queue.discard(msg)
+            storage.remove_scheduled(removed)
+            removed_count = len(removed)
             await state.clear()
             await message.answer(
                 f"✅ Удалено {removed_count} запланированных сообщений!",
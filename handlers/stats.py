@@ -2,6 +2,8 @@
 from aiogram import Router, F
 from aiogram.types import Message
 from database.storage import storage
+from utils.stats_engine import stats_engine, latest_send, recent_events
+from utils.pagination import split_blocks
 import html
 
 router = Router()
@@ -16,28 +18,30 @@ def escape_html(text):
 async def show_general_stats(message: Message):
     text = "📊 <b>Общая статистика:</b>\n\n"
     text += f"Всего отправлено: {storage.stats.get('sent', 0)}\n"
+    text += f"За последний час: {stats_engine.count('total', 'all', 'minute', 60)}\n"
+    text += f"За сегодня: {stats_engine.count('total', 'all', 'day', 1)}\n"
+    text += f"За 7 дней: {stats_engine.count('total', 'all', 'day', 7)}\n"
     text += f"Последняя отправка: {storage.stats.get('last_send', 'никогда')}\n\n"
+
+    by_type = [
+        (media_type, stats_engine.count("type", media_type, "day", 7))
+        for media_type in ("text", "photo", "video", "document")
+    ]
+    by_type = [(media_type, count) for media_type, count in by_type if count]
+    if by_type:
+        text += "📦 <b>По типам за 7 дней:</b>\n"
+        for media_type, count in by_type:
+            text += f"{media_type}: {count}\n"
+        text += "\n"
     
-    latest_time = None
-    latest_acc = None
-    latest_msg = None
-    
-    for acc_name, acc_data in storage.account_stats.items():
-        if acc_data.get('history'):
-            last_msg = acc_data['history'][-1]
-            msg_time = last_msg['time']
-            if not latest_time or msg_time > latest_time:
-                latest_time = msg_time
-                latest_acc = acc_name
-                latest_msg = last_msg
-    
+    latest_msg = latest_send()
     if latest_msg:
         text += "📨 <b>Последнее сообщение:</b>\n"
         text += f"⏰ Время: {latest_msg['time']}\n"
-        text += f"👤 Аккаунт: {escape_html(latest_acc)}\n"
+        text += f"👤 Аккаунт: {escape_html(latest_msg['account'])}\n"
         text += f"📍 Кому: {escape_html(latest_msg['target'])}\n"
         text += f"💬 Текст: {escape_html(latest_msg['text'])}\n"
-    
+
     await message.answer(text, parse_mode="HTML")
 
 @router.message(F.text == "📱 Статистика по аккаунтам")
@@ -46,17 +50,22 @@ async def show_account_stats(message: Message):
         await message.answer("❌ Нет статистики")
         return
     
-    text = "📱 <b>Статистика по аккаунтам:</b>\n\n"
+    blocks = ["📱 <b>Статистика по аккаунтам:</b>\n\n"]
     for name, data in storage.account_stats.items():
-        text += f"<b>{escape_html(name)}</b>: {data['sent']} сообщений\n"
-        
-        if data.get('history'):
-            history = data['history'][-10:]
-            text += f"\n📋 <b>Последние {len(history)} действий:</b>\n"
+        lines = [f"<b>{escape_html(name)}</b>: {data['sent']} сообщений\n"]
+        lines.append(f"За сегодня: {stats_engine.count('account', name, 'day', 1)}, ")
+        lines.append(f"за 7 дней: {stats_engine.count('account', name, 'day', 7)}\n")
+
+        history = recent_events(name)
+        if history:
+            lines.append(f"\n📋 <b>Последние {len(history)} действий:</b>\n")
             for i, msg in enumerate(reversed(history), 1):
-                text += f"{i}. ⏰ {msg['time']}\n"
-                text += f"   📍 {escape_html(msg['target'])}\n"
-                text += f"   💬 {escape_html(msg['text'])}\n\n"
-        text += "─" * 30 + "\n\n"
-    
-    await message.answer(text, parse_mode="HTML")
+                lines.append(f"{i}. ⏰ {msg['time']}\n")
+                lines.append(f"   📍 {escape_html(msg['target'])}\n")
+                lines.append(f"   💬 {escape_html(msg['text'])}\n\n")
+        lines.append("─" * 30 + "\n\n")
+        blocks.append("".join(lines))
+
+    # Каждый аккаунт - целый блок, сообщения не превышают лимит Telegram
+    for chunk in split_blocks(blocks):
+        await message.answer(chunk, parse_mode="HTML")
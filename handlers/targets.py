@@ -5,9 +5,46 @@ from aiogram.fsm.context import FSMContext
 from states.states import AddTarget, DeleteTarget 
 from keyboards.main_kb import cancel_kb, targets_menu
 from database.storage import storage
+from utils.schedule_queue import schedule_queue
+from utils.peer_cache import peer_cache
+from utils.stats_engine import stats_engine
+from utils.pagination import Paginator, render_target_choice
 
 router = Router()
 
+
+def _render_target(number, item):
+    target_id, data = item
+    if data["type"] == "user":
+        line = f"{number}. 👤 @{data['username']}\n"
+    else:
+        line = f"{number}. 👥 Группа {data['chat_id']}\n"
+
+    if data["assigned_accounts"]:
+        line += f" 🔗 Аккаунты: {', '.join(data['assigned_accounts'])}\n"
+    else:
+        line += " 🔗 Аккаунты: не назначены\n"
+    return line + "\n"
+
+
+targets_pages = Paginator(
+    "targets",
+    lambda: storage.targets.items(),
+    _render_target,
+    header="👥 <b>Список получателей:</b>\n\n",
+    collections=("targets",),
+    parse_mode="HTML"
+)
+
+delete_target_pages = Paginator(
+    "delete_target",
+    lambda: storage.targets.items(),
+    render_target_choice,
+    header="Выберите номер получателя для удаления:\n\n",
+    footer="\nОтправьте номер (несколько: 1,3,5 или all):",
+    collections=("targets",)
+)
+
 @router.message(F.text == "➕ Добавить получателя")
 async def add_target_start(message: Message, state: FSMContext):
     await state.set_state(AddTarget.choosing_type)
@@ -45,7 +82,7 @@ async def process_username(message: Message, state: FSMContext):
         "assigned_accounts": []
     }
     
-    storage.save_targets()
+    storage.save_targets(target_id)
     await state.clear()
     await message.answer(f"✅ Пользователь @{username} добавлен!", reply_markup=targets_menu())
 
@@ -65,7 +102,7 @@ async def process_chat_id(message: Message, state: FSMContext):
             "assigned_accounts": []
         }
         
-        storage.save_targets()
+        storage.save_targets(target_id)
         await state.clear()
         await message.answer(f"✅ Группа {chat_id} добавлена!", reply_markup=targets_menu())
     except:
@@ -77,20 +114,7 @@ async def show_targets(message: Message):
         await message.answer("❌ Нет добавленных получателей")
         return
     
-    text = "👥 <b>Список получателей:</b>\n\n"
-    for i, (target_id, data) in enumerate(storage.targets.items(), 1):
-        if data["type"] == "user":
-            text += f"{i}. 👤 @{data['username']}\n"
-        else:
-            text += f"{i}. 👥 Группа {data['chat_id']}\n"
-        
-        if data["assigned_accounts"]:
-            text += f" 🔗 Аккаунты: {', '.join(data['assigned_accounts'])}\n"
-        else:
-            text += " 🔗 Аккаунты: не назначены\n"
-        text += "\n"
-    
-    await message.answer(text, parse_mode="HTML")
+    await targets_pages.send(message)
 
 
 @router.message(F.text == "🗑 Удалить получателя")
@@ -101,56 +125,44 @@ async def delete_target_start(message: Message, state: FSMContext):
     
     await state.set_state(DeleteTarget.choosing_target)
     
-    text = "Выберите номер получателя для удаления:\n\n"
-    target_list = list(storage.targets.items())
-    for i, (tid, data) in enumerate(target_list, 1):
-        if data["type"] == "user":
-            text += f"{i}. 👤 @{data['username']}\n"
-        else:
-            text += f"{i}. 👥 Группа {data['chat_id']}\n"
-    
-    await message.answer(text + "\nОтправьте номер:", reply_markup=cancel_kb())
+    await delete_target_pages.send(message, reply_markup=cancel_kb())
 
-@router.message(DeleteTarget.choosing_target, F.text.regexp(r'^\d+$'))
+@router.message(DeleteTarget.choosing_target, F.text.regexp(r'(?i)^(\d+\s*,\s*)*\d+$|^all$'))
 async def process_target_deletion(message: Message, state: FSMContext):
     try:
-        idx = int(message.text) - 1
         target_list = list(storage.targets.keys())
         
-        if 0 <= idx < len(target_list):
-            target_id = target_list[idx]
-            target_data = storage.targets[target_id]
-            
-
+        if message.text.lower() == "all":
+            selected = target_list
+        else:
+            indices = {int(x.strip()) - 1 for x in message.text.split(',')}
+            selected = [target_list[i] for i in sorted(indices) if 0 <= i < len(target_list)]
+        
+        if not selected:
+            await message.answer("❌ Неверный номер!")
+            return
+        
+        if len(selected) == 1:
+            target_data = storage.targets[selected[0]]
             if target_data["type"] == "user":
-                display_name = f"@{target_data['username']}"
+                display_name = f"Получатель @{target_data['username']} удалён"
             else:
-                display_name = f"Группу {target_data['chat_id']}"
-            
-            del storage.targets[target_id]
-            
-            for draft in storage.drafts:
-                if target_id in draft.get("target_ids", []):
-                    draft["target_ids"].remove(target_id)
-            
-
-            storage.scheduled_messages = [
-                msg for msg in storage.scheduled_messages 
-                if msg.get("target_id") != target_id
-            ]
-            
-
-            storage.save_targets()
-            storage.save_drafts()
-            storage.save_scheduled()
-            
-            await state.clear()
-            await message.answer(
-                f"✅ Получатель {display_name} удалён!\n"
-                f"Также очищены связанные черновики и запланированные сообщения.",
-                reply_markup=targets_menu()
-            )
+                display_name = f"Получатель Группа {target_data['chat_id']} удалён"
         else:
-            await message.answer("❌ Неверный номер!")
+            display_name = f"Удалено получателей: {len(selected)}"
+        
+        # Черновики и запланированные сообщения находятся по индексам storage
+        removed_scheduled = storage.delete_targets(*selected)
+        for msg in removed_scheduled:
+            schedule_queue.discard(msg)
+        peer_cache.forget_targets(*selected)
+        stats_engine.forget_targets(*selected)
+        
+        await state.clear()
+        await message.answer(
+            f"✅ {display_name}!\n"
+            f"Также очищены связанные черновики и запланированные сообщения.",
+            reply_markup=targets_menu()
+        )
     except:
         await message.answer("❌ Ошибка ввода!")
@@ -1,129 +1,130 @@
 # main.py (bot
 import asyncio
 import logging
+import time
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
-from config import BOT_TOKEN
+from config import BOT_TOKEN, CONNECT_CONCURRENCY, CONNECT_TIMEOUT, CONNECT_ON_STARTUP, CLIENT_IDLE_TIMEOUT, ACCOUNT_SHARDS
 from database.storage import storage
-from handlers import start, accounts, targets, messages, drafts, scheduler, stats, assignments
+from utils.schedule_queue import schedule_queue
+from utils.clients import reap_idle_clients
+from utils.health import health
+from utils.jobs import job_engine
+from utils.shards import shard_manager
+from handlers import start, accounts, targets, messages, drafts, scheduler, stats, assignments, jobs, pagination
 
 logging.basicConfig(level=logging.INFO)
 
-async def connect_accounts():
-    """Подключает все сохраненные аккаунты"""
-    print("🔄 Подключение аккаунтов...")
-    for name, acc in storage.accounts.items():
+CONNECT_STATUS_LABELS = {
+    "connected": "подключен",
+    "unauthorized": "нужна авторизация",
+    "timeout": "таймаут",
+    "error": "ошибка",
+}
+
+async def connect_account(name, acc, semaphore):
+    """Подключает один аккаунт; возвращает (статус, время в секундах)"""
+    async with semaphore:
+        started = time.monotonic()
         try:
             client = acc["client"]
-            if not client.is_connected():
-                await client.connect()
-            if not await client.is_user_authorized():
-                print(f"⚠️ {name} требует повторной авторизации")
-            else:
-                print(f"✅ {name} подключен")
+            async with asyncio.timeout(CONNECT_TIMEOUT):
+                authorized = await client.is_user_authorized()
+            elapsed = time.monotonic() - started
+            if not authorized:
+                health.mark(name, "unauthorized")
+                print(f"⚠️ {name} требует повторной авторизации ({elapsed:.1f} сек)")
+                return "unauthorized", elapsed
+            health.mark(name, "connected")
+            print(f"✅ {name} подключен ({elapsed:.1f} сек)")
+            return "connected", elapsed
+        except TimeoutError:
+            health.mark(name, "degraded", "таймаут подключения")
+            print(f"❌ {name}: превышено время подключения ({CONNECT_TIMEOUT:.0f} сек)")
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+            return "timeout", time.monotonic() - started
         except Exception as e:
+            health.mark(name, "degraded", str(e))
             print(f"❌ Ошибка подключения {name}: {e}")
+            return "error", time.monotonic() - started
 
-async def scheduler_task(bot):
-    """Фоновая задача для проверки запланированных сообщений"""
-    from datetime import datetime
-    import random
-    from utils.telethon_auth import send_telegram_message
+async def connect_accounts():
+    """Подключает все сохраненные аккаунты параллельно (не больше CONNECT_CONCURRENCY сразу)"""
+    print(f"🔄 Подключение аккаунтов: {len(storage.accounts)}...")
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(max(1, CONNECT_CONCURRENCY))
+    accounts = list(storage.accounts.items())
+    results = await asyncio.gather(*(connect_account(name, acc, semaphore) for name, acc in accounts))
+
+    report = sorted(zip((name for name, _ in accounts), results), key=lambda item: item[1][1], reverse=True)
+    counts = {}
+    for _, (status, _) in report:
+        counts[status] = counts.get(status, 0) + 1
+    print(
+        f"📊 Подключение завершено за {time.monotonic() - started:.1f} сек: "
+        + ", ".join(f"{CONNECT_STATUS_LABELS[status]}: {count}" for status, count in counts.items())
+    )
+    for name, (status, elapsed) in report[:10]:
+        print(f"   {elapsed:6.1f} сек  {CONNECT_STATUS_LABELS[status]:<18} {name}")
+
+async def send_due_messages(bot, due_messages):
+    """Отправляет пачку наступивших запланированных сообщений одним конвейером"""
+    from utils.delivery import SendPipeline
     
-    print("⏰ Планировщик запущен!")
+    pipeline = SendPipeline(bot, "scheduled")
+    finished = False
+    try:
+        sends = []
+        for msg in due_messages:
+            print(f"⏰ ⚡ ВРЕМЯ ПРИШЛО! Отправка: {msg.get('text', '[Медиа]')[:30]}...")
+            # Аккаунты: указанные в сообщении, иначе назначенные получателю, иначе выбранные account_selector
+            sends.extend(pipeline.plan(msg, [msg.get("target_id")]))
+        
+        # Все готовые сообщения отправляются одной пачкой: аккаунты работают параллельно
+        if sends:
+            results = await pipeline.run(sends)
+            print(f"📊 Итого отправлено: {sum(results)}/{len(sends)} ({len(due_messages)} сообщ.)")
+        finished = True
+    except asyncio.CancelledError:
+        # Остановка бота: неотправленные сообщения остаются в хранилище и очереди
+        for msg in due_messages:
+            schedule_queue.add(msg)
+        raise
+    except Exception as e:
+        print(f"❌ Ошибка отправки запланированных сообщений: {e}")
+        import traceback
+        traceback.print_exc()
+        finished = True
+    finally:
+        pipeline.close()
+        # Сообщения уже вынуты из schedule_queue: удаляем их, иначе повторятся только после перезапуска
+        if finished:
+            storage.remove_scheduled(due_messages)
+            print(f"🗑 Удалено {len(due_messages)} выполненных задач")
+
+async def scheduler_task(bot):
+    """Фоновая задача для отправки запланированных сообщений"""
+    schedule_queue.rebuild(storage.scheduled_messages)
+    print(f"⏰ Планировщик запущен! В очереди: {len(schedule_queue)}")
     
+    # Пачки отправляются отдельными задачами: медленная пачка (лимиты, FloodWait)
+    # не задерживает следующие сообщения
+    batches = set()
     while True:
         try:
-            await asyncio.sleep(30) 
-            
-            if not storage.scheduled_messages:
-                continue
-            
-            now = datetime.now()
-            print(f"🔍 Проверка запланированных ({len(storage.scheduled_messages)} шт.) - {now.strftime('%H:%M:%S')}")
-            
-            to_remove = []
-            
-            for msg in storage.scheduled_messages:
-                try:
-                    send_time = datetime.strptime(msg["time"], "%Y-%m-%d %H:%M:%S")
-                    
-                    print(f"  📅 Сообщение на {send_time.strftime('%d.%m %H:%M')} (осталось: {(send_time - now).total_seconds():.0f} сек)")
-                    
-                    # Проверяем, пришло ли время отправки
-                    if now >= send_time:
-                        print(f"⏰ ⚡ ВРЕМЯ ПРИШЛО! Отправка: {msg.get('text', '[Медиа]')[:30]}...")
-                        
-                        target_id = msg["target_id"]
-                        
-                        if target_id not in storage.targets:
-                            print(f"❌ Получатель {target_id} не найден!")
-                            to_remove.append(msg)
-                            continue
-                        
-                        target_data = storage.targets[target_id]
-                        assigned = msg.get("accounts", []).copy()
-                        
-                        # Если аккаунты не указаны, используем назначенные или случайный
-                        if not assigned:
-                            assigned = target_data.get("assigned_accounts", []).copy()
-                        
-                        if not assigned and storage.accounts:
-                            assigned = [random.choice(list(storage.accounts.keys()))]
-                        
-                        if not assigned:
-                            print("❌ Нет доступных аккаунтов для отправки!")
-                            to_remove.append(msg)
-                            continue
-                        
-                        success_count = 0
-                        for acc_name in assigned:
-                            if acc_name in storage.accounts:
-                                client = storage.accounts[acc_name]["client"]
-                                
-                                # Проверяем подключение
-                                if not client.is_connected():
-                                    print(f"🔌 Подключение {acc_name}...")
-                                    await client.connect()
-                                
-                                # Отправляем сообщение
-                                success = await send_telegram_message(
-                                    client, 
-                                    target_data, 
-                                    msg.get("text", ""), 
-                                    acc_name,
-                                    media_type=msg.get("content_type", "text"),
-                                    file_id=msg.get("file_id"),
-                                    bot=bot
-                                )
-                                
-                                if success:
-                                    success_count += 1
-                                    print(f"✅ Отправлено через {acc_name}")
-                                else:
-                                    print(f"❌ Ошибка отправки через {acc_name}")
-                                
-                                await asyncio.sleep(2)  # Задержка между отправками
-                            else:
-                                print(f"⚠️ Аккаунт {acc_name} не найден")
-                        
-                        print(f"📊 Итого отправлено: {success_count}/{len(assigned)}")
-                        to_remove.append(msg)
-                
-                except Exception as e:
-                    print(f"❌ Ошибка обработки сообщения: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    to_remove.append(msg)
-            
-            # Удаляем отправленные сообщения
-            if to_remove:
-                for msg in to_remove:
-                    if msg in storage.scheduled_messages:
-                        storage.scheduled_messages.remove(msg)
-                storage.save_scheduled()
-                print(f"🗑 Удалено {len(to_remove)} выполненных задач")
+            # Спим ровно до ближайшей отправки; добавление/удаление будит раньше
+            due_messages = await schedule_queue.wait_due()
+            task = asyncio.create_task(send_due_messages(bot, due_messages))
+            batches.add(task)
+            task.add_done_callback(batches.discard)
         
+        except asyncio.CancelledError:
+            for task in batches:
+                task.cancel()
+            raise
         except Exception as e:
             print(f"❌ КРИТИЧЕСКАЯ ОШИБКА планировщика: {e}")
             import traceback
@@ -135,8 +136,9 @@ async def main():
     storage.load_all()
     print(f"📂 Загружено: {len(storage.accounts)} аккаунтов, {len(storage.targets)} получателей, {len(storage.scheduled_messages)} запланированных")
     
-    # Подключаем аккаунты
-    await connect_accounts()
+    # Клиенты аккаунтов переносятся в процессы-шарды до первого подключения
+    if ACCOUNT_SHARDS > 0:
+        shard_manager.start(ACCOUNT_SHARDS)
     
     # Создаем бота
     bot = Bot(token=BOT_TOKEN)
@@ -151,14 +153,34 @@ async def main():
     dp.include_router(scheduler.router)
     dp.include_router(assignments.router)
     dp.include_router(stats.router)
+    dp.include_router(jobs.router)
+    dp.include_router(pagination.router)
     dp.include_router(start.router)  # Start должен быть последним!
     
+    # Аккаунты подключаются в фоне, бот начинает принимать команды сразу
+    if CONNECT_ON_STARTUP:
+        asyncio.create_task(connect_accounts())
+    
+    # Простаивающие клиенты отключаются, при следующей отправке подключатся снова
+    asyncio.create_task(reap_idle_clients(storage.accounts, CLIENT_IDLE_TIMEOUT))
+    
+    # Проверка связи и переподключение открытых клиентов
+    asyncio.create_task(health.run())
+    
     # Запускаем планировщик с объектом bot
     asyncio.create_task(scheduler_task(bot))
     
+    # Рассылки с интервалом (сохранённые продолжаются с места остановки)
+    asyncio.create_task(job_engine.run(bot))
+    
     # Запускаем бота
     print("🤖 Бот запущен!")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        # Шарды передают последние изменения лимитов, затем сохраняем отложенные записи
+        await shard_manager.stop()
+        await storage.flush()
 
 if __name__ == "__main__":
     asyncio.run(main())
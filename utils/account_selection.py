@@ -0,0 +1,82 @@
+# utils/account_selection.py
+import random
+import time
+from config import ACCOUNT_SELECTION
+from database.storage import storage
+from utils.rate_limiter import rate_limiter
+from utils.health import health
+from utils.send_queue import send_queue
+
+# Вес аккаунта без суточной квоты в стратегии "quota"
+UNLIMITED_QUOTA_WEIGHT = 1000
+
+
+class AccountSelector:
+    """Выбор аккаунта для получателя без назначенных аккаунтов.
+
+    Стратегии (ACCOUNT_SELECTION):
+      random       - случайный аккаунт (по умолчанию);
+      lru          - тот, кого дольше всех не выбирали;
+      least_loaded - с самой короткой очередью в send_queue;
+      quota        - случайный с весом по остатку суточной квоты.
+
+    Выбор учитывает только пригодные аккаунты (health) и по возможности
+    не на паузе (rate_limiter). Нагрузка аккаунта - глубина его очереди
+    в send_queue (включая отправки назначенным получателям) плюс отправки,
+    выбранные pick(), но ещё не поставленные в очередь: резерв держится
+    до вызова release() при постановке.
+    """
+
+    def __init__(self, strategy=ACCOUNT_SELECTION):
+        self.strategy = strategy
+        self._pending = {}
+        self._last_picked = {}
+
+    def candidates(self, exclude=()):
+        usable = [
+            name for name in storage.accounts
+            if name not in exclude and health.is_usable(name)
+        ]
+        available = [name for name in usable if rate_limiter.is_available(name)]
+        # Аккаунты с проверенным соединением - в первую очередь
+        healthy = [name for name in available if health.is_healthy(name)]
+        return healthy or available or usable
+
+    def load(self, account_name):
+        return send_queue.depth(account_name) + self._pending.get(account_name, 0)
+
+    def _choose(self, candidates):
+        if self.strategy == "lru":
+            return min(candidates, key=lambda name: self._last_picked.get(name, 0))
+        if self.strategy == "least_loaded":
+            lowest = min(self.load(name) for name in candidates)
+            return random.choice([name for name in candidates if self.load(name) == lowest])
+        if self.strategy == "quota":
+            weights = []
+            for name in candidates:
+                remaining = rate_limiter.remaining_quota(name)
+                weights.append(UNLIMITED_QUOTA_WEIGHT if remaining is None else remaining)
+            if any(weights):
+                return random.choices(candidates, weights=weights)[0]
+        return random.choice(candidates)
+
+    def pick(self, exclude=()):
+        """Выбирает аккаунт и резервирует за ним отправку; None, если аккаунтов нет"""
+        candidates = self.candidates(exclude)
+        if not candidates:
+            return None
+        name = self._choose(candidates)
+        self._pending[name] = self._pending.get(name, 0) + 1
+        self._last_picked[name] = time.monotonic()
+        return name
+
+    def release(self, account_name):
+        """Отправка, зарезервированная pick(), поставлена в очередь (или не понадобилась)"""
+        pending = self._pending.get(account_name, 0)
+        if pending <= 1:
+            self._pending.pop(account_name, None)
+        else:
+            self._pending[account_name] = pending - 1
+
+
+account_selector = AccountSelector()
@@ -0,0 +1,99 @@
+# utils/clients.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from telethon import TelegramClient
+
+
+class LazyClient:
+    """Клиент Telethon, который создаётся и подключается при первом обращении.
+
+    Файл сессии не открывается до первого use(). Пока клиент используется,
+    он не отключается; после CLIENT_IDLE_TIMEOUT простоя его отключает
+    reap_idle_clients, а следующее обращение подключит заново.
+    """
+
+    # Клиент работает в этом процессе (см. RemoteClient в utils/shards.py)
+    remote = False
+
+    def __init__(self, name, api_id, api_hash, client=None):
+        self.name = name
+        self.api_id = api_id
+        self.api_hash = api_hash
+        self._client = client
+        self._lock = asyncio.Lock()
+        self._in_use = 0
+        self.last_used = time.monotonic()
+
+    def is_connected(self):
+        return self._client is not None and self._client.is_connected()
+
+    def is_open(self):
+        """Создан ли TelegramClient (открыт ли файл сессии)"""
+        return self._client is not None
+
+    def idle_for(self):
+        """Секунд с последнего использования (0, пока клиент занят)"""
+        if self._in_use:
+            return 0
+        return time.monotonic() - self.last_used
+
+    async def connect(self, touch=True):
+        """Создаёт клиент при необходимости и подключает его.
+
+        touch=False - служебное обращение (проверка связи), которое
+        не считается использованием и не откладывает отключение по простою.
+        """
+        async with self._lock:
+            if self._client is None:
+                self._client = TelegramClient(f"sessions/{self.name}", self.api_id, self.api_hash)
+            if not self._client.is_connected():
+                await self._client.connect()
+            if touch:
+                self.last_used = time.monotonic()
+            return self._client
+
+    @asynccontextmanager
+    async def use(self):
+        """Подключённый TelegramClient на время блока; клиент не будет отключён как простаивающий"""
+        self._in_use += 1
+        try:
+            yield await self.connect()
+        finally:
+            self._in_use -= 1
+            self.last_used = time.monotonic()
+
+    async def send(self, target_data, text, media_type="text", file_id=None, bot=None, media=None):
+        """Отправляет сообщение от имени аккаунта (см. send_telegram_message)"""
+        from utils.telethon_auth import send_telegram_message
+        async with self.use() as client:
+            return await send_telegram_message(
+                client, target_data, text, self.name,
+                media_type=media_type, file_id=file_id, bot=bot, media=media
+            )
+
+    async def is_user_authorized(self):
+        async with self.use() as client:
+            return await client.is_user_authorized()
+
+    async def disconnect(self):
+        """Отключает клиент и закрывает файл сессии"""
+        async with self._lock:
+            client, self._client = self._client, None
+            if client is not None:
+                await client.disconnect()
+
+
+async def reap_idle_clients(accounts, idle_timeout):
+    """Фоновая задача: отключает клиенты аккаунтов, простаивающие дольше idle_timeout"""
+    interval = max(1, min(60, idle_timeout / 2))
+    while True:
+        await asyncio.sleep(interval)
+        for name, acc in list(accounts.items()):
+            client = acc.get("client")
+            if isinstance(client, LazyClient) and client.is_open() and client.idle_for() > idle_timeout:
+                try:
+                    await client.disconnect()
+                    print(f"💤 {name} отключен после {idle_timeout:.0f} сек простоя")
+                except Exception as e:
+                    print(f"❌ Ошибка отключения {name}: {e}")
@@ -0,0 +1,222 @@
+# utils/delivery.py
+import asyncio
+from functools import partial
+from config import FLOOD_MAX_RETRIES, FLOOD_WAIT_MAX_SECONDS
+from database.storage import storage
+from utils.rate_limiter import rate_limiter
+from utils.telethon_auth import AccountFloodWait
+from utils.stats_engine import record_send
+from utils.media import MediaHandle
+from utils.health import health
+from utils.account_selection import account_selector
+from utils.send_queue import send_queue, PRIORITIES
+
+
+async def send_with_failover(acc_name, target_data, text, priority, media_type="text", file_id=None, bot=None,
+                             failover=False, media=None, tried=()):
+    """Отправка с обработкой FloodWait.
+
+    Сообщение не теряется: оно повторяется тем же аккаунтом после паузы
+    или (если failover=True) сразу передаётся другому свободному аккаунту.
+    С failover=True аккаунт на паузе после FloodWait или с исчерпанной
+    суточной квотой заменяется другим ещё до отправки. Пауза дольше
+    FLOOD_WAIT_MAX_SECONDS не ожидается никогда: без замены отправка
+    сразу считается неудачной.
+
+    priority - класс send_queue, в воркере которой идёт отправка. Отправка
+    другим аккаунтом ставится в его очередь (send_queue.reroute)
+    и возвращается future с её результатом: очередь текущего аккаунта
+    не ждёт чужую отправку. tried - аккаунты, которые уже не подошли.
+
+    Резерв account_selector за начальным аккаунтом снимает вызывающий.
+    """
+    tried = set(tried)
+
+    def hand_over(alternative):
+        future = send_queue.reroute(alternative, partial(
+            send_with_failover, alternative, target_data, text, priority, media_type=media_type,
+            file_id=file_id, bot=bot, failover=True, media=media, tried=tried
+        ), priority)
+        # Дальше нагрузку alternative учитывает глубина его очереди
+        account_selector.release(alternative)
+        return future
+
+    for _ in range(FLOOD_MAX_RETRIES + 1):
+        if acc_name not in storage.accounts:
+            print(f"⚠️ Аккаунт {acc_name} не найден")
+            return False
+
+        reason = None
+        parked = rate_limiter.parked_for(acc_name)
+        if not health.is_usable(acc_name):
+            reason = health.describe(acc_name)[1]
+        elif parked > FLOOD_WAIT_MAX_SECONDS or (failover and not rate_limiter.is_available(acc_name)):
+            reason = f"на паузе после FloodWait ({parked:.0f} сек)" if parked else "суточная квота исчерпана"
+        if reason:
+            tried.add(acc_name)
+            alternative = account_selector.pick(tried) if failover else None
+            if alternative:
+                print(f"🔁 {acc_name}: {reason}, отправка передана {alternative}")
+                return hand_over(alternative)
+            if not health.is_usable(acc_name) or parked > FLOOD_WAIT_MAX_SECONDS:
+                # Паузу дольше FLOOD_WAIT_MAX_SECONDS не ждём: acquire занял бы очередь аккаунта
+                print(f"❌ {acc_name}: {reason}, отправка пропущена")
+                return False
+            # Без замены: пауза дождётся в rate_limiter.acquire, при исчерпанной квоте отправка не удастся
+
+        try:
+            # Клиент может работать в процессе-шарде; статистика всегда ведётся здесь
+            sent = await storage.accounts[acc_name]["client"].send(
+                target_data, text, media_type=media_type, file_id=file_id, bot=bot, media=media
+            )
+            if sent:
+                record_send(acc_name, target_data, text, media_type)
+            return sent
+        except AccountFloodWait as e:
+            tried.add(acc_name)
+            alternative = account_selector.pick(tried) if failover else None
+            if alternative:
+                print(f"🔁 {acc_name} во FloodWait, отправка передана {alternative}")
+                return hand_over(alternative)
+            if e.seconds > FLOOD_WAIT_MAX_SECONDS:
+                print(f"❌ {acc_name}: FloodWait {e.seconds} сек превышает лимит ожидания")
+                return False
+            # rate_limiter.acquire сам дождётся окончания паузы
+            print(f"⏳ {acc_name}: повтор после FloodWait через {e.seconds} сек")
+
+    print(f"❌ Отправка не удалась после {FLOOD_MAX_RETRIES} повторов FloodWait")
+    return False
+
+
+class SendPipeline:
+    """Единая отправка: сообщение × получатели → аккаунты → send_with_failover.
+
+    spec - dict с полями как у запланированного сообщения и рассылки:
+    text, content_type, file_id, file_unique_id и необязательный accounts.
+    Аккаунты получателя: spec["accounts"], иначе назначенные получателю,
+    иначе выбранный account_selector (с правом передать отправку другому
+    аккаунту при FloodWait). Каждый медиафайл готовится один раз на весь
+    конвейер (общий MediaHandle). Отправки идут через общую send_queue
+    с приоритетом конвейера (interactive, scheduled или bulk), темп каждого
+    аккаунта задаёт rate_limiter.
+    """
+
+    def __init__(self, bot, priority="bulk"):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Неизвестный приоритет: {priority}")
+        self.bot = bot
+        self.priority = priority
+        self._media = {}
+
+    def resolve_accounts(self, spec, target_data):
+        """Аккаунты для получателя и признак failover"""
+        assigned = list(spec.get("accounts") or target_data.get("assigned_accounts", []))
+        if assigned:
+            return [name for name in assigned if name in storage.accounts], False
+        picked = account_selector.pick()
+        return ([picked] if picked else []), True
+
+    def _media_for(self, spec):
+        file_id = spec.get("file_id")
+        if not file_id:
+            return None
+        if file_id not in self._media:
+            self._media[file_id] = MediaHandle(
+                self.bot, file_id, spec.get("content_type", "text"), spec.get("file_unique_id")
+            )
+        return self._media[file_id]
+
+    def plan(self, spec, target_ids):
+        """Список отправок аккаунт → получатель; удалённые получатели пропускаются.
+
+        Получатель без доступных аккаунтов попадает в план с account=None
+        и считается неудачной отправкой.
+        """
+        sends = []
+        for target_id in target_ids:
+            target_data = storage.targets.get(target_id)
+            if target_data is None:
+                print(f"❌ Получатель {target_id} не найден!")
+                continue
+            accounts, failover = self.resolve_accounts(spec, target_data)
+            if not accounts:
+                print(f"❌ Нет доступных аккаунтов для {target_id}")
+                accounts = [None]
+            for acc_name in accounts:
+                sends.append({
+                    "account": acc_name,
+                    "target_data": target_data,
+                    "spec": spec,
+                    "failover": failover,
+                })
+        return sends
+
+    async def _send(self, send):
+        spec = send["spec"]
+        # Темп отправки аккаунта задаёт rate_limiter внутри send_telegram_message
+        return await send_with_failover(
+            send["account"], send["target_data"], spec.get("text", ""), self.priority,
+            media_type=spec.get("content_type", "text"), file_id=spec.get("file_id"),
+            bot=self.bot, failover=send["failover"], media=self._media_for(spec)
+        )
+
+    async def run(self, sends):
+        """Выполняет план через send_queue. Возвращает результаты (True/False) в порядке sends.
+
+        Постановка в очередь ждёт свободного места (backpressure), поэтому
+        большой план попадает в очередь по мере её разбора. Отправки каждого
+        аккаунта ставятся отдельно: очередь одного аккаунта не задерживает
+        постановку для других.
+        """
+        results = [False] * len(sends)
+        by_account = {}
+        for idx, send in enumerate(sends):
+            if send["account"] is not None:
+                by_account.setdefault(send["account"], []).append((idx, send))
+
+        async def feed(acc_name, acc_sends):
+            queued = []
+            try:
+                for idx, send in acc_sends:
+                    future = await send_queue.put(acc_name, partial(self._send, send), self.priority)
+                    if send["failover"]:
+                        # Резерв из resolve_accounts снимается при постановке: дальше отправку видно в send_queue.depth
+                        account_selector.release(acc_name)
+                    queued.append((idx, future))
+                for idx, future in queued:
+                    try:
+                        results[idx] = await future
+                    except asyncio.CancelledError:
+                        if asyncio.current_task().cancelling():
+                            raise
+                        # Отменилась сама отправка, а не конвейер: она не удалась
+                    except Exception:
+                        pass  # ошибку уже показал воркер send_queue
+            except asyncio.CancelledError:
+                # Ещё не отправленные сообщения отменённого конвейера убираются из очереди
+                for _, future in queued:
+                    future.cancel()
+                for _, send in acc_sends[len(queued):]:
+                    if send["failover"]:
+                        account_selector.release(acc_name)
+                raise
+
+        await asyncio.gather(*(feed(acc_name, acc_sends) for acc_name, acc_sends in by_account.items()))
+
+        if len(sends) > 1:
+            for acc_name, acc_sends in by_account.items():
+                sent = sum(1 for idx, _ in acc_sends if results[idx])
+                print(f"📊 {acc_name}: отправлено {sent}/{len(acc_sends)}")
+        return results
+
+    async def send(self, spec, target_ids):
+        """План и отправка одного сообщения; возвращает (успешно, ошибок)"""
+        results = await self.run(self.plan(spec, target_ids))
+        sent = sum(results)
+        return sent, len(results) - sent
+
+    def close(self):
+        """Освобождает медиафайлы конвейера"""
+        for handle in self._media.values():
+            handle.close()
+        self._media = {}
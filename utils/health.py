@@ -0,0 +1,156 @@
+# utils/health.py
+import asyncio
+import random
+import time
+from telethon import functions
+from telethon.errors import (
+    UnauthorizedError,
+    UserDeactivatedError,
+    UserDeactivatedBanError,
+    PhoneNumberBannedError,
+)
+from config import HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT, HEALTH_MAX_BACKOFF
+from database.storage import storage
+
+# Аккаунт заблокирован или удалён
+BANNED_ERRORS = (
+    UserDeactivatedError,
+    UserDeactivatedBanError,
+    PhoneNumberBannedError,
+)
+
+# Состояние -> (значок, подпись)
+STATES = {
+    "authorized": ("🟢", "работает"),
+    "connected": ("🟡", "подключен, не проверен"),
+    "idle": ("⚪", "не подключен"),
+    "degraded": ("🟠", "нет связи, переподключение"),
+    "unauthorized": ("🔴", "нужна авторизация"),
+    "banned": ("⛔", "заблокирован"),
+}
+
+# В этих состояниях аккаунт не используется для отправки
+UNUSABLE_STATES = ("unauthorized", "banned")
+
+
+class HealthSupervisor:
+    """Следит за соединениями аккаунтов и заранее переподключает их.
+
+    Проверяются только уже открытые клиенты (LazyClient.is_open): простаивающие
+    аккаунты не будятся, их подключит первая отправка. Неудачная проверка
+    переводит аккаунт в degraded и повторяется с экспоненциальной паузой
+    со случайным разбросом, чтобы аккаунты не переподключались разом.
+    """
+
+    def __init__(self):
+        self._health = {}
+
+    def _entry(self, account_name):
+        return self._health.setdefault(account_name, {
+            "state": "idle",
+            "failures": 0,
+            "next_probe": 0.0,
+            "error": None,
+        })
+
+    def state(self, account_name):
+        entry = self._health.get(account_name)
+        stored = entry["state"] if entry else "idle"
+        if stored in UNUSABLE_STATES or stored == "degraded":
+            return stored
+        # Соединение может оборваться или закрыться между проверками
+        acc = storage.accounts.get(account_name)
+        if acc is None or not acc["client"].is_open():
+            return "idle"
+        if not acc["client"].is_connected():
+            return "degraded"
+        return stored if stored != "idle" else "connected"
+
+    def describe(self, account_name):
+        """Значок и подпись состояния для списков"""
+        return STATES[self.state(account_name)]
+
+    def error(self, account_name):
+        """Последняя ошибка аккаунта (None, если её нет)"""
+        entry = self._health.get(account_name)
+        return entry["error"] if entry else None
+
+    def is_usable(self, account_name):
+        return self.state(account_name) not in UNUSABLE_STATES
+
+    def is_healthy(self, account_name):
+        """Подключён и проверен - отправка пойдёт без задержки на подключение"""
+        return self.state(account_name) == "authorized"
+
+    def record_error(self, account_name, error):
+        """Учитывает ошибку отправки: блокировка и потеря авторизации видны сразу"""
+        if isinstance(error, BANNED_ERRORS):
+            self.mark(account_name, "banned", type(error).__name__)
+        elif isinstance(error, UnauthorizedError):
+            self.mark(account_name, "unauthorized", type(error).__name__)
+        elif isinstance(error, (ConnectionError, OSError, TimeoutError)):
+            self.mark(account_name, "degraded", str(error) or type(error).__name__)
+
+    def mark(self, account_name, state, error=None):
+        entry = self._entry(account_name)
+        if state in ("authorized", "connected", "idle"):
+            entry["failures"] = 0
+            entry["next_probe"] = time.monotonic() + HEALTH_PROBE_INTERVAL
+        elif state == "degraded":
+            entry["failures"] += 1
+            backoff = min(HEALTH_MAX_BACKOFF, 2 ** entry["failures"])
+            entry["next_probe"] = time.monotonic() + backoff * random.uniform(0.5, 1.5)
+        if entry["state"] != state:
+            print(f"🩺 {account_name}: {STATES[state][1]}" + (f" ({error})" if error else ""))
+        entry["state"] = state
+        entry["error"] = error
+
+    def forget(self, account_name):
+        self._health.pop(account_name, None)
+
+    async def probe(self, account_name):
+        """Проверяет аккаунт запросом к серверу, при обрыве переподключает"""
+        acc = storage.accounts.get(account_name)
+        if acc is None:
+            self.forget(account_name)
+            return
+        lazy = acc["client"]
+        try:
+            async with asyncio.timeout(HEALTH_PROBE_TIMEOUT):
+                # touch=False: проверка не продлевает жизнь простаивающего клиента
+                client = await lazy.connect(touch=False)
+                await client(functions.updates.GetStateRequest())
+            self.mark(account_name, "authorized")
+        except TimeoutError:
+            self.mark(account_name, "degraded", "таймаут")
+        except (UnauthorizedError, *BANNED_ERRORS) as e:
+            self.record_error(account_name, e)
+        except Exception as e:
+            self.mark(account_name, "degraded", str(e) or type(e).__name__)
+
+    async def run(self):
+        """Фоновая задача: проверки по расписанию каждого аккаунта"""
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            due = []
+            for account_name, acc in list(storage.accounts.items()):
+                # Клиенты процессов-шардов проверяет сам шард
+                if acc["client"].remote:
+                    continue
+                entry = self._entry(account_name)
+                if entry["state"] in UNUSABLE_STATES:
+                    continue
+                if not acc["client"].is_open():
+                    if entry["state"] != "degraded":
+                        entry["state"] = "idle"
+                        continue
+                # Оборванное соединение восстанавливаем сразу, не дожидаясь плановой проверки
+                dropped = acc["client"].is_open() and not acc["client"].is_connected() and entry["state"] != "degraded"
+                if dropped or entry["next_probe"] <= now:
+                    due.append(account_name)
+            if due:
+                await asyncio.gather(*(self.probe(name) for name in due))
+
+
+health = HealthSupervisor()
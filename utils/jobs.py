@@ -0,0 +1,339 @@
+# utils/jobs.py
+import asyncio
+import contextlib
+import time
+import traceback
+from datetime import datetime, timedelta
+from aiogram.exceptions import TelegramBadRequest
+from config import JOBS_MAX_CONCURRENT, JOB_PROGRESS_INTERVAL, JOB_SEND_WINDOW
+from database.storage import storage
+from utils.schedule_queue import job_queue, TIME_FORMAT
+from utils.delivery import SendPipeline
+
+PROGRESS_BAR_WIDTH = 10
+
+
+def progress_bar(done, total):
+    filled = PROGRESS_BAR_WIDTH * done // total if total else PROGRESS_BAR_WIDTH
+    return "▓" * filled + "░" * (PROGRESS_BAR_WIDTH - filled)
+
+
+class JobEngine:
+    """Рассылки с интервалом, которые переживают перезапуск бота.
+
+    Задача хранится в storage.jobs: упорядоченный список получателей,
+    курсор (сколько получателей уже обработано) и время следующего шага
+    next_run. Шаги планирует job_queue - та же очередь на куче, что и у
+    запланированных сообщений. Курсор записывается сразу после каждого
+    получателя, поэтому после перезапуска рассылка продолжается с места
+    остановки, а не с начала, и отправленным получателям не повторяется.
+
+    Движок владеет задачами шагов (_running): рассылку можно приостановить,
+    продолжить или отменить. Одновременно отправляют не больше
+    JOBS_MAX_CONCURRENT рассылок с интервалом, остальные ждут свободного
+    места; мгновенная отправка в этот лимит не входит.
+
+    Мгновенная отправка - рассылка с interval=0: её получатели отправляются
+    параллельно окном до JOB_SEND_WINDOW (каждый аккаунт разбирает свою
+    очередь в send_queue), курсор продвигается по завершённым подряд
+    получателям, а завершённые после курсора запоминаются в job["done"].
+    Если у рассылки есть progress_message, это сообщение редактируется
+    по ходу отправки, но не чаще раза в JOB_PROGRESS_INTERVAL секунд.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self._pipelines = {}
+        self._running = {}
+        self._reported = {}
+        self._reports = set()
+        self._slots = asyncio.Semaphore(max(1, JOBS_MAX_CONCURRENT))
+
+    def create(self, target_ids, text, interval, media_type="text", file_id=None,
+               file_unique_id=None, accounts=None, title="", progress_message=None):
+        """Сохраняет новую рассылку и ставит первый шаг на сейчас.
+
+        Содержимое копируется в задачу: правка или удаление черновика
+        не меняет уже запущенную рассылку. progress_message - сообщение
+        бота, в котором показывается ход отправки.
+        """
+        now = datetime.now().strftime(TIME_FORMAT)
+        job = {
+            "id": storage.new_scheduled_id(),
+            "title": title,
+            "target_ids": list(target_ids),
+            "cursor": 0,
+            "done": [],
+            "status": "active",
+            "sent": 0,
+            "failed": 0,
+            "interval": interval,
+            "next_run": now,
+            "created": now,
+            "text": text,
+            "content_type": media_type,
+            "file_id": file_id,
+            "file_unique_id": file_unique_id,
+            "accounts": list(accounts or []),
+            "progress_message": {
+                "chat_id": progress_message.chat.id,
+                "message_id": progress_message.message_id,
+            } if progress_message else None,
+        }
+        storage.jobs[job["id"]] = job
+        storage.save_jobs(job["id"])
+        job_queue.add(job)
+        return job
+
+    def get(self, job_id):
+        return storage.jobs.get(job_id)
+
+    def jobs(self):
+        """Все незавершённые рассылки в порядке создания"""
+        return sorted(storage.jobs.values(), key=lambda job: job["created"])
+
+    def is_running(self, job_id):
+        """Идёт ли сейчас отправка шага рассылки"""
+        return job_id in self._running
+
+    def progress(self, job):
+        """Прогресс рассылки: отправлено, ошибок, осталось получателей и ожидаемое время окончания"""
+        remaining = len(job["target_ids"]) - job["cursor"] - len(job.get("done", []))
+        eta = None
+        if job.get("status", "active") == "active" and remaining > 0:
+            next_run = max(datetime.strptime(job["next_run"], TIME_FORMAT), datetime.now())
+            eta = next_run + timedelta(seconds=job["interval"] * (remaining - 1))
+        return {
+            "sent": job["sent"],
+            "failed": job.get("failed", 0),
+            "remaining": remaining,
+            "eta": eta,
+        }
+
+    def pause(self, job_id):
+        """Приостанавливает рассылку; начатая отправка одному получателю доводится до конца"""
+        job = storage.jobs.get(job_id)
+        if job is None or job.get("status", "active") == "paused":
+            return None
+        job["status"] = "paused"
+        job_queue.discard(job)
+        storage.save_jobs(job_id)
+        print(f"⏸ Рассылка {job_id[:8]} приостановлена")
+        return job
+
+    def resume(self, job_id):
+        """Продолжает приостановленную рассылку со следующего получателя сразу"""
+        job = storage.jobs.get(job_id)
+        if job is None or job.get("status", "active") != "paused":
+            return None
+        job["status"] = "active"
+        job["next_run"] = datetime.now().strftime(TIME_FORMAT)
+        storage.save_jobs(job_id)
+        # Если шаг ещё выполняется, он сам поставит следующий в очередь
+        if job_id not in self._running:
+            job_queue.add(job)
+        print(f"▶️ Рассылка {job_id[:8]} продолжена")
+        return job
+
+    def cancel(self, job_id):
+        """Останавливает рассылку и удаляет её (и текущую отправку тоже)"""
+        job = storage.jobs.get(job_id)
+        if job is None:
+            return None
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        job_queue.discard(job)
+        self._finish(job, cancelled=True)
+        return job
+
+    def _pipeline_for(self, job):
+        """Конвейер рассылки: медиафайл готовится один раз на все шаги"""
+        if job["id"] not in self._pipelines:
+            # Мгновенная отправка из бота обгоняет рассылки с интервалом
+            priority = "interactive" if job["interval"] == 0 else "bulk"
+            self._pipelines[job["id"]] = SendPipeline(self.bot, priority)
+        return self._pipelines[job["id"]]
+
+    async def _step(self, job):
+        """Один шаг рассылки: следующий получатель, затем перенос на interval
+        (без интервала - все оставшиеся получатели сразу, см. _send_all)"""
+        target_ids = job["target_ids"]
+        # Мгновенная отправка из бота не ждёт, пока рассылки с интервалом освободят место
+        slot = self._slots if job["interval"] else contextlib.nullcontext()
+        async with slot:
+            # Пока шаг ждал свободного места, рассылку могли приостановить
+            if job.get("status", "active") != "active":
+                return
+
+            if job["interval"] == 0:
+                await self._send_all(job)
+            else:
+                # Удалённые получатели пропускаются без ожидания интервала
+                while job["cursor"] < len(target_ids) and target_ids[job["cursor"]] not in storage.targets:
+                    job["cursor"] += 1
+
+            if job["interval"] and job["cursor"] < len(target_ids):
+                try:
+                    sent, failed = await self._pipeline_for(job).send(job, [target_ids[job["cursor"]]])
+                    job["sent"] += sent
+                    job["failed"] = job.get("failed", 0) + failed
+                except Exception as e:
+                    print(f"❌ Рассылка {job['id'][:8]}: ошибка отправки: {e}")
+                    traceback.print_exc()
+                    job["failed"] = job.get("failed", 0) + 1
+                finally:
+                    job["cursor"] += 1
+
+        if job["id"] not in storage.jobs:
+            return
+        if job["cursor"] >= len(target_ids):
+            self._finish(job)
+            return
+        if job.get("status", "active") != "active":
+            await self._persist(job)
+            return
+
+        job["next_run"] = (datetime.now() + timedelta(seconds=job["interval"])).strftime(TIME_FORMAT)
+        await self._persist(job)
+        await self._report(job)
+        # Пока обновлялся прогресс, рассылку могли приостановить или отменить
+        if job["id"] not in storage.jobs or job.get("status", "active") != "active":
+            return
+        # Следующий шаг может начаться сразу: этот снимается с учёта до постановки в очередь
+        self._running.pop(job["id"], None)
+        job_queue.add(job)
+
+    async def _send_all(self, job):
+        """Мгновенная рассылка: окно параллельных отправок, курсор сохраняется по ходу.
+
+        Отправки окна завершаются не по порядку: номера завершённых после
+        курсора хранятся в job["done"] и при продолжении не отправляются
+        повторно. Возвращается, когда все получатели обработаны или рассылку
+        приостановили (уже начатые отправки доводятся до конца).
+        """
+        pipeline = self._pipeline_for(job)
+        target_ids = job["target_ids"]
+        done = set(job.get("done", []))
+        # Номер получателя → задача отправки
+        window = {}
+        next_index = job["cursor"]
+        try:
+            while True:
+                while (job.get("status", "active") == "active" and next_index < len(target_ids)
+                       and len(window) < JOB_SEND_WINDOW):
+                    # Удалённые получатели и отправленные до перезапуска пропускаются
+                    if next_index not in done and target_ids[next_index] in storage.targets:
+                        window[next_index] = asyncio.create_task(pipeline.send(job, [target_ids[next_index]]))
+                    next_index += 1
+
+                changed = False
+                for index, task in list(window.items()):
+                    if task.done():
+                        del window[index]
+                        self._count(job, task)
+                        done.add(index)
+                        changed = True
+                # До next_index всё, что не в окне, уже обработано
+                while job["cursor"] < next_index and job["cursor"] not in window:
+                    done.discard(job["cursor"])
+                    job["cursor"] += 1
+                    changed = True
+                if changed:
+                    job["done"] = sorted(done)
+                    await self._persist(job)
+                    await self._report(job)
+
+                if not window:
+                    return
+                await asyncio.wait(window.values(), return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            for task in window.values():
+                task.cancel()
+            raise
+
+    async def _persist(self, job):
+        """Сохраняет курсор сразу, не дожидаясь окна STORAGE_FLUSH_DELAYS:
+        после аварийной остановки отправки не повторяются"""
+        storage.save_jobs(job["id"])
+        await storage.flush_collection("jobs")
+
+    def _count(self, job, task):
+        try:
+            sent, failed = task.result()
+        except Exception as e:
+            print(f"❌ Рассылка {job['id'][:8]}: ошибка отправки: {e}")
+            sent, failed = 0, 1
+        job["sent"] += sent
+        job["failed"] = job.get("failed", 0) + failed
+
+    def progress_text(self, job, result=None):
+        """Текст сообщения с прогрессом; result - итог ("завершена"/"отменена")"""
+        total = len(job["target_ids"])
+        title = job.get("title") or "Рассылка"
+        if result is None:
+            text = f"📤 {title}: {job['cursor']}/{total}\n{progress_bar(job['cursor'], total)}\n"
+        else:
+            text = f"{'🛑' if result == 'отменена' else '✅'} {title}: отправка {result}\n"
+        return text + f"✅ Отправлено: {job['sent']}  ❌ Ошибок: {job.get('failed', 0)}"
+
+    async def _report(self, job, result=None):
+        """Обновляет сообщение с прогрессом (промежуточные обновления - не чаще JOB_PROGRESS_INTERVAL)"""
+        target = job.get("progress_message")
+        if not target or self.bot is None:
+            return
+        now = time.monotonic()
+        if result is None and now - self._reported.get(job["id"], 0) < JOB_PROGRESS_INTERVAL:
+            return
+        self._reported[job["id"]] = now
+        try:
+            await self.bot.edit_message_text(
+                self.progress_text(job, result),
+                chat_id=target["chat_id"], message_id=target["message_id"]
+            )
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                print(f"⚠️ Рассылка {job['id'][:8]}: не удалось обновить прогресс: {e}")
+        except Exception as e:
+            print(f"⚠️ Рассылка {job['id'][:8]}: не удалось обновить прогресс: {e}")
+
+    def _finish(self, job, cancelled=False):
+        storage.jobs.pop(job["id"], None)
+        storage.save_jobs(job["id"])
+        pipeline = self._pipelines.pop(job["id"], None)
+        if pipeline:
+            pipeline.close()
+        self._reported.pop(job["id"], None)
+        result = "отменена" if cancelled else "завершена"
+        if job.get("progress_message"):
+            task = asyncio.create_task(self._report(job, result))
+            self._reports.add(task)
+            task.add_done_callback(self._reports.discard)
+        print(
+            f"{'🛑' if cancelled else '✅'} Рассылка {job['id'][:8]} {result}: "
+            f"отправлено {job['sent']}, ошибок {job.get('failed', 0)}, получателей {len(job['target_ids'])}"
+        )
+
+    async def run(self, bot):
+        """Фоновая задача: восстанавливает сохранённые рассылки и выполняет их шаги"""
+        self.bot = bot
+        active = [job for job in storage.jobs.values() if job.get("status", "active") == "active"]
+        job_queue.rebuild(active)
+        if storage.jobs:
+            print(f"📨 Возобновлено рассылок: {len(active)}, на паузе: {len(storage.jobs) - len(active)}")
+
+        while True:
+            for job in await job_queue.wait_due():
+                if job["id"] not in storage.jobs or job["id"] in self._running:
+                    continue
+                # Шаг идёт отдельной задачей: долгая отправка не задерживает другие рассылки
+                task = asyncio.create_task(self._step(job))
+                self._running[job["id"]] = task
+                task.add_done_callback(lambda task, job_id=job["id"]: self._forget_step(job_id, task))
+
+    def _forget_step(self, job_id, task):
+        if self._running.get(job_id) is task:
+            del self._running[job_id]
+
+
+job_engine = JobEngine()
@@ -0,0 +1,74 @@
+# utils/media.py
+import asyncio
+from utils.media_cache import media_cache
+
+MEDIA_EXTENSIONS = {"photo": ".jpg", "video": ".mp4", "document": ""}
+
+
+class MediaHandle:
+    """Медиафайл одной рассылки.
+
+    Файл берётся из media_cache (скачивается из Bot API только при промахе;
+    небольшие файлы передаются из памяти без временных файлов),
+    а загружается в Telegram один раз на каждый аккаунт (client.upload_file).
+    Полученный InputFile переиспользуется для всех следующих получателей
+    этого аккаунта.
+    """
+
+    def __init__(self, bot, file_id, media_type, file_unique_id=None, source=None):
+        self.bot = bot
+        self.file_id = file_id
+        self.media_type = media_type
+        self.cache_key = media_cache.make_key(file_id, file_unique_id)
+        self.file_unique_id = file_unique_id
+        self.file_name = f"{self.cache_key}{MEDIA_EXTENSIONS.get(media_type, '')}"
+        # source - содержимое, уже полученное другим процессом (bytes или путь):
+        # такой файл не скачивается и не закрепляется в кэше этим handle
+        self._source = source
+        self._owns_source = source is None
+        self._download_lock = asyncio.Lock()
+        self._uploads = {}
+        self._upload_locks = {}
+        self._close_callbacks = []
+
+    async def source(self):
+        """Возвращает содержимое файла из кэша: bytes или путь (закреплён, пока handle открыт)"""
+        async with self._download_lock:
+            if self._source is None:
+                media_cache.pin(self.cache_key)
+                try:
+                    self._source = await media_cache.fetch(
+                        self.bot, self.file_id, self.file_unique_id,
+                        suffix=MEDIA_EXTENSIONS.get(self.media_type, "")
+                    )
+                except BaseException:
+                    media_cache.unpin(self.cache_key)
+                    raise
+            return self._source
+
+    async def input_file(self, client, account_name):
+        """Загружает файл в Telegram от имени аккаунта (один раз) и возвращает InputFile"""
+        lock = self._upload_locks.setdefault(account_name, asyncio.Lock())
+        async with lock:
+            if account_name not in self._uploads:
+                source = await self.source()
+                self._uploads[account_name] = await client.upload_file(source, file_name=self.file_name)
+            return self._uploads[account_name]
+
+    def forget(self, account_name):
+        """Сбрасывает загрузку аккаунта (например, если сервер её уже не помнит)"""
+        self._uploads.pop(account_name, None)
+
+    def on_close(self, callback):
+        """callback() будет вызван при close(), например, чтобы процесс-шард забыл свою копию файла"""
+        self._close_callbacks.append(callback)
+
+    def close(self):
+        """Освобождает файл: он остаётся в кэше, но может быть вытеснен"""
+        if self._source is not None and self._owns_source:
+            media_cache.unpin(self.cache_key)
+            self._source = None
+        self._uploads.clear()
+        callbacks, self._close_callbacks = self._close_callbacks, []
+        for callback in callbacks:
+            callback()
@@ -0,0 +1,186 @@
+# utils/media_cache.py
+import asyncio
+import hashlib
+import io
+import os
+from collections import OrderedDict
+from config import MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, MEDIA_MEMORY_THRESHOLD, MEDIA_MEMORY_MAX_BYTES
+
+
+class MediaCache:
+    """Кэш медиафайлов Bot API.
+
+    Файлы адресуются по file_unique_id (одинаков для одного и того же
+    содержимого), одновременные запросы одного файла объединяются в одну
+    загрузку, а при превышении бюджета удаляются давно не использованные
+    файлы (LRU). Файлы, которые сейчас используются (pin), не удаляются.
+
+    Файлы не больше memory_threshold хранятся в памяти и передаются
+    в Telethon без временных файлов; диск используется только для крупных.
+    """
+
+    def __init__(self, directory, max_bytes, memory_threshold, memory_max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_threshold = memory_threshold
+        self.memory_max_bytes = memory_max_bytes
+        self._entries = OrderedDict()  # key -> (path, size)
+        self._memory = OrderedDict()   # key -> bytes
+        self._pending = {}
+        self._pins = {}
+        self._total = 0
+        self._memory_total = 0
+        self._scanned = False
+        self._disk_ok = True
+
+    @staticmethod
+    def make_key(file_id, file_unique_id=None):
+        if file_unique_id:
+            return file_unique_id
+        return hashlib.sha1(file_id.encode()).hexdigest()
+
+    def _scan(self):
+        """Подхватывает файлы, оставшиеся с прошлого запуска"""
+        self._scanned = True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            names = os.listdir(self.directory)
+        except OSError as e:
+            print(f"⚠️ Кэш медиа на диске недоступен ({e}), используется только память")
+            self._disk_ok = False
+            return
+
+        files = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.endswith(".part"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, os.path.splitext(name)[0], path, st.st_size))
+        for _, key, path, size in sorted(files):
+            self._entries[key] = (path, size)
+            self._total += size
+        self._evict()
+
+    def pin(self, key):
+        self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key):
+        count = self._pins.get(key, 0) - 1
+        if count > 0:
+            self._pins[key] = count
+        else:
+            self._pins.pop(key, None)
+            self._evict()
+
+    def _evict(self, keep=None):
+        for key in list(self._entries):
+            if self._total <= self.max_bytes:
+                break
+            if key in self._pins or key == keep:
+                continue
+            path, size = self._entries.pop(key)
+            self._total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        for key in list(self._memory):
+            if self._memory_total <= self.memory_max_bytes:
+                break
+            if key in self._pins or key == keep:
+                continue
+            self._memory_total -= len(self._memory.pop(key))
+
+    def _lookup(self, key):
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            return data
+
+        entry = self._entries.get(key)
+        if entry:
+            if os.path.exists(entry[0]):
+                self._entries.move_to_end(key)
+                try:
+                    os.utime(entry[0])
+                except OSError:
+                    pass
+                return entry[0]
+            self._entries.pop(key)
+            self._total -= entry[1]
+        return None
+
+    async def fetch(self, bot, file_id, file_unique_id=None, suffix=""):
+        """Возвращает содержимое файла: bytes (в памяти) или путь на диске.
+
+        Скачивание происходит только при промахе кэша. Чтобы файл не был
+        вытеснен, пока он нужен, вызывающий код закрепляет ключ через pin()
+        до вызова fetch().
+        """
+        if not self._scanned:
+            self._scan()
+
+        key = self.make_key(file_id, file_unique_id)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        task = self._pending.get(key)
+        if task is None:
+            # Загрузка - отдельная задача, не принадлежащая ни одному вызывающему:
+            # отмена одного из ожидающих не прерывает её для остальных
+            task = asyncio.create_task(self._download(bot, file_id, key, suffix))
+            self._pending[key] = task
+            task.add_done_callback(lambda task, key=key: self._forget_pending(key, task))
+        return await asyncio.shield(task)
+
+    def _forget_pending(self, key, task):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled():
+            task.exception()  # помечаем как полученное, если никто не ждал
+
+    async def _download(self, bot, file_id, key, suffix):
+        file = await bot.get_file(file_id)
+        size = file.file_size or 0
+
+        result = None
+        if size > self.memory_threshold and self._disk_ok:
+            result = await self._download_to_disk(bot, file.file_path, key, suffix)
+        if result is None:
+            buffer = io.BytesIO()
+            await bot.download_file(file.file_path, destination=buffer)
+            result = buffer.getvalue()
+            self._memory[key] = result
+            self._memory_total += len(result)
+
+        self._evict(keep=key)
+        return result
+
+    async def _download_to_disk(self, bot, file_path, key, suffix):
+        path = os.path.join(self.directory, f"{key}{suffix}")
+        tmp_path = f"{path}.part"
+        try:
+            await bot.download_file(file_path, destination=tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить медиа на диск ({e}), файл будет передан из памяти")
+            self._disk_ok = False
+            return None
+
+        size = os.path.getsize(path)
+        self._entries[key] = (path, size)
+        self._total += size
+        return path
+
+
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, MEDIA_MEMORY_THRESHOLD, MEDIA_MEMORY_MAX_BYTES)
@@ -0,0 +1,154 @@
+# utils/pagination.py
+from itertools import islice
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from database.storage import storage
+
+# Ограничение Telegram на длину текста одного сообщения
+MESSAGE_LIMIT = 4096
+
+# Элементов на странице по умолчанию
+PAGE_SIZE = 20
+
+# Префикс callback_data кнопок листания: "page:<список>:<страница>"
+CALLBACK_PREFIX = "page"
+
+paginators = {}
+
+# Значки типов содержимого в списках сообщений и черновиков
+TYPE_EMOJI = {"text": "💬", "photo": "🖼", "video": "🎥", "document": "📎"}
+
+
+def target_name(data):
+    """Имя получателя для списков: @username или «Группа <chat_id>»"""
+    if data["type"] == "user":
+        return f"@{data['username']}"
+    return f"Группа {data['chat_id']}"
+
+
+# Строки списков выбора (номер + элемент) для Paginator в разных обработчиках
+
+def render_target_choice(number, item):
+    target_id, data = item
+    return f"{number}. {target_name(data)}\n"
+
+
+def render_account_choice(number, name):
+    return f"{number}. {name}\n"
+
+
+def render_draft_choice(number, draft):
+    return f"{draft['id']}. {draft['text'][:40] if draft.get('text') else '[Медиа]'}...\n"
+
+
+def split_blocks(blocks, limit=MESSAGE_LIMIT):
+    """Собирает блоки текста в сообщения не длиннее limit.
+
+    Блок не разрывается между сообщениями; слишком длинный блок обрезается.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for block in blocks:
+        if len(block) > limit:
+            block = block[:limit - 1] + "…"
+        if current and size + len(block) > limit:
+            chunks.append("".join(current))
+            current = []
+            size = 0
+        current.append(block)
+        size += len(block)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+class Paginator:
+    """Постраничный вывод списка с inline-кнопками ◀️/▶️.
+
+    items - функция, возвращающая коллекцию (len + итерация в стабильном порядке);
+    render_item(number, item) - строка для элемента с номером от 1.
+    Отрисованные страницы кэшируются и сбрасываются, когда меняется версия
+    любой из коллекций storage из collections. Без collections кэша нет.
+    """
+
+    def __init__(self, name, items, render_item, header="", footer="",
+                 collections=(), page_size=PAGE_SIZE, parse_mode=None):
+        self.name = name
+        self.items = items
+        self.render_item = render_item
+        self.header = header
+        self.footer = footer
+        self.collections = tuple(collections)
+        self.page_size = page_size
+        self.parse_mode = parse_mode
+        self._cache = {}
+        self._cache_version = None
+        paginators[name] = self
+
+    def page_count(self):
+        return max(1, -(-len(self.items()) // self.page_size))
+
+    def _page_text(self, page):
+        if self.collections:
+            version = tuple(storage.version(name) for name in self.collections)
+            if version != self._cache_version:
+                self._cache.clear()
+                self._cache_version = version
+            cached = self._cache.get(page)
+            if cached is not None:
+                return cached
+
+        start = page * self.page_size
+        lines = [self.header]
+        for number, item in enumerate(islice(self.items(), start, start + self.page_size), start + 1):
+            lines.append(self.render_item(number, item))
+        text = "".join(lines)
+        if len(text) > MESSAGE_LIMIT:
+            text = text[:MESSAGE_LIMIT - 1] + "…"
+
+        if self.collections:
+            self._cache[page] = text
+        return text
+
+    def _markup(self, page, pages):
+        if pages <= 1:
+            return None
+        buttons = []
+        if page > 0:
+            buttons.append(InlineKeyboardButton(text="◀️", callback_data=f"{CALLBACK_PREFIX}:{self.name}:{page - 1}"))
+        buttons.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data=f"{CALLBACK_PREFIX}:{self.name}:{page}"))
+        if page < pages - 1:
+            buttons.append(InlineKeyboardButton(text="▶️", callback_data=f"{CALLBACK_PREFIX}:{self.name}:{page + 1}"))
+        return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+    def render(self, page=0):
+        """Текст и клавиатура страницы (номер страницы ограничивается допустимым)"""
+        pages = self.page_count()
+        page = min(max(page, 0), pages - 1)
+        return self._page_text(page), self._markup(page, pages)
+
+    async def send(self, message, reply_markup=None):
+        """Отправляет первую страницу.
+
+        Если страница одна, footer и reply_markup идут в том же сообщении.
+        Иначе inline-кнопки листания висят на странице, а footer с
+        reply_markup отправляется отдельным сообщением.
+        """
+        text, markup = self.render(0)
+        if markup is None:
+            await message.answer(text + self.footer, parse_mode=self.parse_mode, reply_markup=reply_markup)
+            return
+        await message.answer(text, parse_mode=self.parse_mode, reply_markup=markup)
+        if self.footer.strip() or reply_markup is not None:
+            await message.answer(self.footer.strip() or "⬆️", reply_markup=reply_markup)
+
+    async def show(self, message, page):
+        """Заменяет страницу в уже отправленном сообщении"""
+        text, markup = self.render(page)
+        try:
+            await message.edit_text(text, parse_mode=self.parse_mode, reply_markup=markup)
+        except TelegramBadRequest as e:
+            # Нажатие на кнопку текущей страницы - сообщение не изменилось
+            if "message is not modified" not in str(e):
+                raise
@@ -0,0 +1,93 @@
+# utils/peer_cache.py
+from telethon import types
+from telethon.errors import (
+    PeerIdInvalidError,
+    ChannelInvalidError,
+    ChatIdInvalidError,
+    UserIdInvalidError,
+)
+from database.storage import storage
+
+# Ошибки, после которых сохранённый peer считается устаревшим
+PEER_INVALID_ERRORS = (
+    PeerIdInvalidError,
+    ChannelInvalidError,
+    ChatIdInvalidError,
+    UserIdInvalidError,
+)
+
+
+def target_key(target_data):
+    """Ключ получателя в том же виде, что и в storage.targets"""
+    if target_data["type"] == "user":
+        return f"user_{target_data['username']}"
+    return f"group_{target_data['chat_id']}"
+
+
+def _serialize(peer):
+    if isinstance(peer, types.InputPeerUser):
+        return {"type": "user", "id": peer.user_id, "hash": peer.access_hash}
+    if isinstance(peer, types.InputPeerChannel):
+        return {"type": "channel", "id": peer.channel_id, "hash": peer.access_hash}
+    if isinstance(peer, types.InputPeerChat):
+        return {"type": "chat", "id": peer.chat_id}
+    return None
+
+
+def _deserialize(data):
+    if data["type"] == "user":
+        return types.InputPeerUser(data["id"], data["hash"])
+    if data["type"] == "channel":
+        return types.InputPeerChannel(data["id"], data["hash"])
+    return types.InputPeerChat(data["id"])
+
+
+class PeerCache:
+    """Кэш разрешённых получателей (InputPeer + access_hash) для каждого аккаунта.
+
+    Хранится в storage.peers как {аккаунт: {id получателя: peer}}, поэтому
+    ResolveUsername выполняется не чаще одного раза на пару аккаунт/получатель.
+    """
+
+    async def resolve(self, client, account_name, target_data):
+        key = target_key(target_data)
+        cached = storage.peers.get(account_name, {}).get(key)
+        if cached:
+            return _deserialize(cached)
+
+        if target_data["type"] == "user":
+            peer = await client.get_input_entity(target_data["username"])
+        else:
+            chat_id = int(target_data["chat_id"])
+            try:
+                peer = await client.get_input_entity(chat_id)
+            except ValueError:
+                # Группы ещё нет в кэше сессии - подгружаем диалоги и пробуем снова
+                await client.get_dialogs()
+                peer = await client.get_input_entity(chat_id)
+
+        data = _serialize(peer)
+        if data:
+            storage.peers.setdefault(account_name, {})[key] = data
+            storage.save_peers(account_name)
+        return peer
+
+    def invalidate(self, account_name, target_data):
+        if storage.peers.get(account_name, {}).pop(target_key(target_data), None):
+            storage.save_peers(account_name)
+
+    def forget_account(self, account_name):
+        if storage.peers.pop(account_name, None) is not None:
+            storage.save_peers(account_name)
+
+    def forget_targets(self, *target_ids):
+        changed = []
+        for account_name, peers in storage.peers.items():
+            removed = [peers.pop(target_id) for target_id in target_ids if target_id in peers]
+            if removed:
+                changed.append(account_name)
+        if changed:
+            storage.save_peers(*changed)
+
+
+peer_cache = PeerCache()
@@ -0,0 +1,107 @@
+# utils/rate_limiter.py
+import asyncio
+import time
+from datetime import datetime
+from config import RATE_LIMIT_BURST, RATE_LIMIT_PER_MINUTE, RATE_LIMIT_DAILY_QUOTA
+from database.storage import storage
+
+
+class RateLimiter:
+    """Token bucket на каждый аккаунт + суточная квота + пауза после FloodWait.
+
+    Состояние хранится в storage.rate_limits и переживает перезапуск.
+    Ключи "burst", "per_minute" и "daily_quota" в записи аккаунта
+    переопределяют значения из config.
+    """
+
+    def __init__(self):
+        self._locks = {}
+
+    def limits(self, account_name):
+        """Возвращает (burst, per_minute, daily_quota) для аккаунта"""
+        state = storage.rate_limits.get(account_name, {})
+        return (
+            state.get("burst", RATE_LIMIT_BURST),
+            state.get("per_minute", RATE_LIMIT_PER_MINUTE),
+            state.get("daily_quota", RATE_LIMIT_DAILY_QUOTA),
+        )
+
+    def _state(self, account_name):
+        burst, _, _ = self.limits(account_name)
+        state = storage.rate_limits.setdefault(account_name, {})
+        state.setdefault("tokens", burst)
+        state.setdefault("updated", time.time())
+        today = datetime.now().strftime("%Y-%m-%d")
+        if state.get("day") != today:
+            state["day"] = today
+            state["sent_today"] = 0
+        return state
+
+    def _refill(self, account_name, state):
+        burst, per_minute, _ = self.limits(account_name)
+        now = time.time()
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(burst, state["tokens"] + elapsed * per_minute / 60)
+        state["updated"] = now
+
+    def remaining_quota(self, account_name):
+        """Сколько отправок осталось на сегодня (None - без ограничения)"""
+        _, _, quota = self.limits(account_name)
+        if not quota:
+            return None
+        return max(0, quota - self._state(account_name)["sent_today"])
+
+    def park(self, account_name, seconds):
+        """Блокирует аккаунт на указанное сервером время (FloodWait)"""
+        state = self._state(account_name)
+        state["parked_until"] = max(state.get("parked_until", 0), time.time() + seconds)
+        storage.save_rate_limits(account_name)
+        print(f"🧊 {account_name}: FloodWait, пауза {seconds} сек")
+
+    def parked_for(self, account_name):
+        """Сколько секунд аккаунт ещё заблокирован (0 - доступен)"""
+        state = storage.rate_limits.get(account_name, {})
+        return max(0.0, state.get("parked_until", 0) - time.time())
+
+    def is_available(self, account_name):
+        """Аккаунт не заблокирован и у него осталась квота"""
+        if self.parked_for(account_name) > 0:
+            return False
+        remaining = self.remaining_quota(account_name)
+        return remaining is None or remaining > 0
+
+    async def acquire(self, account_name):
+        """Ждёт свободный токен аккаунта. Возвращает False, если суточная квота исчерпана."""
+        lock = self._locks.setdefault(account_name, asyncio.Lock())
+        async with lock:
+            while True:
+                parked = self.parked_for(account_name)
+                if parked > 0:
+                    await asyncio.sleep(parked)
+                    continue
+
+                state = self._state(account_name)
+                _, per_minute, quota = self.limits(account_name)
+
+                if quota and state["sent_today"] >= quota:
+                    print(f"⛔ {account_name}: суточная квота исчерпана ({quota})")
+                    return False
+
+                if per_minute <= 0:
+                    # Темп не ограничен - учитываем только квоту
+                    state["sent_today"] += 1
+                    storage.save_rate_limits(account_name)
+                    return True
+
+                self._refill(account_name, state)
+                if state["tokens"] >= 1:
+                    state["tokens"] -= 1
+                    state["sent_today"] += 1
+                    storage.save_rate_limits(account_name)
+                    return True
+
+                wait = (1 - state["tokens"]) * 60 / per_minute
+                await asyncio.sleep(wait)
+
+
+rate_limiter = RateLimiter()
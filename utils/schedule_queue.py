@@ -0,0 +1,111 @@
+# utils/schedule_queue.py
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ScheduleQueue:
+    """Очередь записей на min-куче по времени срабатывания.
+
+    Запись - dict со строковым "id" и временем в поле time_key (TIME_FORMAT).
+    Время каждой записи разбирается один раз при добавлении. Удалённые и
+    перепланированные записи не вынимаются из кучи сразу, а пропускаются
+    при извлечении (ленивое удаление). Повторный add() той же записи
+    переносит её на новое время.
+    """
+
+    def __init__(self, time_key="time"):
+        self.time_key = time_key
+        self._heap = []
+        self._seq = itertools.count()
+        self._live = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._live)
+
+    def rebuild(self, items):
+        """Полностью пересобирает очередь из списка записей"""
+        self._heap = []
+        self._live = {}
+        for item in items:
+            entry = self._make_entry(item)
+            if entry:
+                self._heap.append(entry)
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def add(self, item):
+        """Добавляет (или переносит) запись в очереди и будит планировщик"""
+        entry = self._make_entry(item)
+        if entry:
+            heapq.heappush(self._heap, entry)
+            self._wakeup.set()
+
+    def discard(self, item):
+        """Убирает запись из очереди (если она там есть)"""
+        if self._live.pop(item["id"], None) is not None:
+            self._wakeup.set()
+
+    def clear(self):
+        self._heap = []
+        self._live = {}
+        self._wakeup.set()
+
+    def __contains__(self, item):
+        return item["id"] in self._live
+
+    def _make_entry(self, item):
+        try:
+            fire_at = datetime.strptime(item[self.time_key], TIME_FORMAT).timestamp()
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"⚠️ Некорректное время в записи {item.get('id')}: {e}")
+            return None
+        seq = next(self._seq)
+        self._live[item["id"]] = seq
+        return (fire_at, seq, item)
+
+    def _drop_stale(self):
+        # Актуальна только последняя запись с данным id
+        while self._heap and self._live.get(self._heap[0][2]["id"]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def next_fire_time(self):
+        """Время ближайшей отправки (timestamp) или None, если очередь пуста"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Извлекает все записи, время которых уже наступило"""
+        now = datetime.now().timestamp() if now is None else now
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, item = heapq.heappop(self._heap)
+            del self._live[item["id"]]
+            due.append(item)
+            self._drop_stale()
+        return due
+
+    async def wait_due(self):
+        """Спит ровно до ближайшей записи (или до изменения очереди) и возвращает готовые"""
+        while True:
+            due = self.pop_due()
+            if due:
+                return due
+
+            self._wakeup.clear()
+            fire_at = self.next_fire_time()
+            timeout = None if fire_at is None else max(0.0, fire_at - datetime.now().timestamp())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+schedule_queue = ScheduleQueue()
+# Рассылки с интервалом: время следующего шага в job["next_run"]
+job_queue = ScheduleQueue(time_key="next_run")
@@ -0,0 +1,126 @@
+# utils/send_queue.py
+import asyncio
+import heapq
+import itertools
+import traceback
+from config import SEND_QUEUE_CAPACITY
+
+# Классы приоритета: меньше - раньше
+PRIORITIES = {"interactive": 0, "scheduled": 1, "bulk": 2}
+
+
+class SendQueue:
+    """Общая очередь отправок с классами приоритета и ограниченной ёмкостью.
+
+    У каждого аккаунта своя куча (приоритет, порядок поступления) и свой
+    воркер, который отправляет по одному сообщению. Аккаунты разбирают
+    очередь параллельно и независимо, а внутри аккаунта интерактивные
+    отправки обгоняют запланированные и массовые. В каждом классе не больше
+    SEND_QUEUE_CAPACITY ожидающих отправок: put() ждёт свободного места,
+    поэтому большая рассылка притормаживает сама себя, но не блокирует
+    интерактивные отправки.
+
+    Отправка может вернуть future из reroute(): её передали очереди
+    другого аккаунта, и результат той отправки станет результатом этой.
+    Воркер не ждёт чужую отправку и сразу берёт следующую.
+    """
+
+    def __init__(self, capacity=SEND_QUEUE_CAPACITY):
+        self.capacity = max(1, capacity)
+        self._heaps = {}
+        self._workers = {}
+        self._seq = itertools.count()
+        self._slots = {priority: asyncio.Semaphore(self.capacity) for priority in PRIORITIES}
+        self._pending = dict.fromkeys(PRIORITIES, 0)
+        self._sending = set()
+
+    def pending(self):
+        """Сколько отправок ждёт в каждом классе приоритета"""
+        return dict(self._pending)
+
+    def depth(self, account_name):
+        """Глубина очереди аккаунта: ожидающие отправки плюс выполняемая сейчас"""
+        return len(self._heaps.get(account_name, ())) + (account_name in self._sending)
+
+    async def put(self, account_name, send, priority="bulk"):
+        """Ставит отправку в очередь аккаунта и возвращает future с её результатом.
+
+        send - функция без аргументов, возвращающая корутину отправки.
+        Если класс заполнен, ждёт, пока воркеры не разберут очередь.
+        """
+        await self._slots[priority].acquire()
+        return self._push(account_name, send, priority, holds_slot=True)
+
+    def reroute(self, account_name, send, priority):
+        """Передаёт отправку в очередь другого аккаунта (failover из воркера).
+
+        Не ждёт свободного места: воркер, ожидающий места в очереди, мог бы
+        остановить разбор очередей. Возвращает future с результатом.
+        """
+        return self._push(account_name, send, priority, holds_slot=False)
+
+    def _push(self, account_name, send, priority, holds_slot):
+        future = asyncio.get_running_loop().create_future()
+        heap = self._heaps.setdefault(account_name, [])
+        heapq.heappush(heap, (PRIORITIES[priority], next(self._seq), priority, send, future, holds_slot))
+        self._pending[priority] += 1
+
+        worker = self._workers.get(account_name)
+        if worker is None or worker.done():
+            self._workers[account_name] = asyncio.create_task(self._drain(account_name))
+        return future
+
+    @staticmethod
+    def _chain(source, target):
+        """Результат source становится результатом target; отмена target отменяет source"""
+        def copy(source):
+            if target.done():
+                return
+            if source.cancelled():
+                target.cancel()
+            elif source.exception() is not None:
+                target.set_exception(source.exception())
+            else:
+                target.set_result(source.result())
+
+        source.add_done_callback(copy)
+        target.add_done_callback(lambda target: source.cancel() if target.cancelled() else None)
+
+    async def _drain(self, account_name):
+        """Воркер аккаунта: отправляет по одной, пока очередь аккаунта не опустеет.
+
+        Future каждой взятой отправки разрешается всегда: результатом,
+        исключением отправки или отменой.
+        """
+        heap = self._heaps[account_name]
+        while heap:
+            _, _, priority, send, future, holds_slot = heapq.heappop(heap)
+            self._pending[priority] -= 1
+            if holds_slot:
+                self._slots[priority].release()
+            # Отправитель перестал ждать (рассылку отменили) - отправка не нужна
+            if future.done():
+                continue
+            self._sending.add(account_name)
+            try:
+                result = await send()
+            except asyncio.CancelledError:
+                # Отменили сам воркер - выходим; иначе отменилась только эта отправка
+                future.cancel()
+                if asyncio.current_task().cancelling():
+                    raise
+                continue
+            except Exception as e:
+                print(f"❌ Очередь {account_name}: ошибка отправки: {e}")
+                traceback.print_exc()
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            finally:
+                self._sending.discard(account_name)
+            if isinstance(result, asyncio.Future):
+                self._chain(result, future)
+            elif not future.done():
+                future.set_result(result)
+
+send_queue = SendQueue()
@@ -0,0 +1,420 @@
+# utils/shards.py
+import asyncio
+import itertools
+import multiprocessing
+import traceback
+import zlib
+from collections import OrderedDict
+from functools import partial
+from config import CLIENT_IDLE_TIMEOUT
+from database.storage import storage
+from utils.clients import LazyClient, reap_idle_clients
+from utils.health import health
+from utils.media import MediaHandle
+
+# Изменения этих коллекций шард пересылает процессу бота
+FORWARDED_COLLECTIONS = ("rate_limits", "peers")
+MEDIA_TYPES = ("photo", "video", "document")
+# Сколько полученных медиафайлов шард держит одновременно. Файл лежит в кэше
+# процесса бота, поэтому шард забывает его, когда бот закрывает свой MediaHandle
+SHARD_MEDIA_HANDLES = 32
+# Как часто шард сообщает о состоянии аккаунтов (сек)
+HEALTH_REPORT_INTERVAL = 1
+# Как часто процесс бота проверяет, что шарды живы (сек)
+WATCHDOG_INTERVAL = 5
+
+
+def shard_of(account_name, shard_count):
+    """Номер шарда аккаунта: хеш имени, одинаковый при каждом запуске"""
+    return zlib.crc32(account_name.encode()) % shard_count
+
+
+class ForwardingBackend:
+    """Backend хранилища в процессе-шарде: вместо записи на диск пересылает
+    изменения rate_limits и peers процессу бота, который их и сохраняет"""
+
+    row_level = True
+
+    def __init__(self, events):
+        self.events = events
+
+    def load(self):
+        return {}
+
+    def save(self, name, data, keys=None):
+        if name in FORWARDED_COLLECTIONS:
+            self.events.put(("save", name, data, list(keys) if keys is not None else None))
+
+    def close(self):
+        pass
+
+
+class ShardWorker:
+    """Процесс-шард: владеет клиентами своих аккаунтов и выполняет запросы процесса бота.
+
+    Запрос - (id, операция, аргументы); ответ - ("result"/"error", id, значение).
+    Без id ответ не отправляется. Проверку соединений (health.run) и отключение
+    простаивающих клиентов шард выполняет сам, а состояние аккаунтов
+    отправляет событиями "health".
+    """
+
+    def __init__(self, index, requests, events):
+        self.index = index
+        self.requests = requests
+        self.events = events
+        self._media = OrderedDict()
+        self._reported = {}
+        self._tasks = set()
+
+    async def serve(self):
+        storage.backend = ForwardingBackend(self.events)
+        background = [
+            asyncio.create_task(reap_idle_clients(storage.accounts, CLIENT_IDLE_TIMEOUT)),
+            asyncio.create_task(health.run()),
+            asyncio.create_task(self._report_health()),
+        ]
+        print(f"🧩 Шард {self.index} запущен")
+
+        while True:
+            message = await asyncio.to_thread(self.requests.get)
+            if message is None:
+                break
+            req_id, op, args = message
+            task = asyncio.create_task(self._handle(req_id, op, args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        for task in background:
+            task.cancel()
+        for acc in storage.accounts.values():
+            try:
+                await acc["client"].disconnect()
+            except Exception:
+                pass
+        await storage.flush()
+
+    async def _handle(self, req_id, op, args):
+        try:
+            result = await getattr(self, f"op_{op}")(*args)
+        except Exception as e:
+            traceback.print_exc()
+            if req_id is not None:
+                self.events.put(("error", req_id, f"{type(e).__name__}: {e}"))
+        else:
+            if req_id is not None:
+                self.events.put(("result", req_id, result))
+
+    async def op_add(self, name, api_id, api_hash, rate_limits, peers):
+        storage.accounts[name] = {
+            "api_id": api_id,
+            "api_hash": api_hash,
+            "client": LazyClient(name, api_id, api_hash),
+        }
+        if rate_limits is not None:
+            storage.rate_limits[name] = rate_limits
+        if peers is not None:
+            storage.peers[name] = peers
+
+    async def op_remove(self, name):
+        acc = storage.accounts.pop(name, None)
+        if acc:
+            await acc["client"].disconnect()
+        storage.rate_limits.pop(name, None)
+        storage.peers.pop(name, None)
+        health.forget(name)
+        self._reported.pop(name, None)
+
+    async def op_authorized(self, name):
+        authorized = await storage.accounts[name]["client"].is_user_authorized()
+        health.mark(name, "connected" if authorized else "unauthorized")
+        return authorized
+
+    async def op_disconnect(self, name):
+        await storage.accounts[name]["client"].disconnect()
+
+    def _media_handle(self, file_id, media_type, media):
+        """MediaHandle по содержимому от процесса бота; None, если содержимое ещё не передано"""
+        key = (file_id, media["file_unique_id"])
+        handle = self._media.get(key)
+        if handle is not None:
+            self._media.move_to_end(key)
+            return handle
+        if media["source"] is None:
+            return None
+        handle = MediaHandle(None, file_id, media_type, media["file_unique_id"], source=media["source"])
+        self._media[key] = handle
+        if len(self._media) > SHARD_MEDIA_HANDLES:
+            self._media.popitem(last=False)
+        return handle
+
+    async def op_drop_media(self, file_id, file_unique_id):
+        """Процесс бота закрыл медиафайл: путь к нему может стать недействительным"""
+        handle = self._media.pop((file_id, file_unique_id), None)
+        if handle is not None:
+            handle.close()
+
+    async def op_send(self, name, target_data, text, media_type, file_id, media):
+        """Отправка; FloodWait возвращается как {"flood_wait": сек}, нехватка файла - {"need_media": True}"""
+        from utils.telethon_auth import AccountFloodWait
+
+        acc = storage.accounts.get(name)
+        if acc is None:
+            return False
+        handle = None
+        if media is not None:
+            handle = self._media_handle(file_id, media_type, media)
+            if handle is None:
+                return {"need_media": True}
+        try:
+            return await acc["client"].send(target_data, text, media_type=media_type, file_id=file_id, media=handle)
+        except AccountFloodWait as e:
+            return {"flood_wait": e.seconds}
+
+    async def _report_health(self):
+        while True:
+            await asyncio.sleep(HEALTH_REPORT_INTERVAL)
+            for name, acc in list(storage.accounts.items()):
+                client = acc["client"]
+                status = (health.state(name), health.error(name), client.is_open(), client.is_connected())
+                if self._reported.get(name) != status:
+                    self._reported[name] = status
+                    self.events.put(("health", name, *status))
+
+
+def shard_main(index, requests, events):
+    """Точка входа процесса-шарда"""
+    try:
+        asyncio.run(ShardWorker(index, requests, events).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+class RemoteClient:
+    """Клиент аккаунта, работающий в процессе-шарде.
+
+    Повторяет ту часть интерфейса LazyClient, которой пользуется остальной
+    код (send, is_user_authorized, disconnect, is_open, is_connected).
+    Состояние соединения приходит от шарда вместе с событиями health.
+    """
+
+    remote = True
+
+    def __init__(self, manager, name, shard):
+        self.manager = manager
+        self.name = name
+        self.shard = shard
+        self.open = False
+        self.connected = False
+
+    def is_open(self):
+        return self.open
+
+    def is_connected(self):
+        return self.connected
+
+    def idle_for(self):
+        return 0
+
+    async def _request_send(self, target_data, text, media_type, file_id, media, with_source):
+        payload = None
+        if media is not None and file_id and media_type in MEDIA_TYPES:
+            payload = {
+                "file_unique_id": media.file_unique_id,
+                # Файл передаётся шарду один раз, дальше шард использует свою копию
+                "source": await media.source() if with_source else None,
+            }
+        return await self.manager.request(
+            self.shard, "send", self.name, target_data, text, media_type, file_id, payload
+        )
+
+    async def send(self, target_data, text, media_type="text", file_id=None, bot=None, media=None):
+        """Отправка через шард; файл скачивается здесь, а загружается в Telegram шардом"""
+        from utils.telethon_auth import AccountFloodWait
+
+        temporary = None
+        if media is None and file_id and bot and media_type in MEDIA_TYPES:
+            media = temporary = MediaHandle(bot, file_id, media_type)
+        try:
+            result = await self._request_send(target_data, text, media_type, file_id, media, False)
+            if isinstance(result, dict) and result.get("need_media"):
+                # Копия шарда действительна, пока этот handle держит файл в кэше
+                media.on_close(partial(self.manager.drop_media, self.shard, file_id, media.file_unique_id))
+                result = await self._request_send(target_data, text, media_type, file_id, media, True)
+        finally:
+            if temporary:
+                temporary.close()
+
+        if isinstance(result, dict) and "flood_wait" in result:
+            raise AccountFloodWait(self.name, result["flood_wait"])
+        return bool(result)
+
+    async def is_user_authorized(self):
+        return await self.manager.request(self.shard, "authorized", self.name)
+
+    async def disconnect(self):
+        await self.manager.request(self.shard, "disconnect", self.name)
+
+
+class ShardManager:
+    """Процессы-шарды для клиентов аккаунтов и связь с ними через очереди multiprocessing.
+
+    Каждый аккаунт принадлежит одному шарду (shard_of): там работает его
+    LazyClient, а в storage.accounts процесса бота лежит RemoteClient.
+    Шарды пересылают изменения rate_limits/peers и состояние соединений,
+    а статистику отправок ведёт send_with_failover в процессе бота, поэтому
+    лимиты, health и статистика по-прежнему собираются и сохраняются здесь.
+    Упавший шард перезапускается, его аккаунты передаются ему заново.
+    """
+
+    def __init__(self):
+        self.shard_count = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._requests = []
+        self._events = None
+        self._pending = {}
+        self._ids = itertools.count()
+        self._reader = None
+        self._watchdog = None
+
+    @property
+    def active(self):
+        return self.shard_count > 0
+
+    def start(self, shard_count):
+        """Запускает шарды и передаёт им все загруженные аккаунты (до первого подключения клиентов)"""
+        self.shard_count = shard_count
+        self._events = self._context.Queue()
+        self._processes = [None] * shard_count
+        self._requests = [None] * shard_count
+        for index in range(shard_count):
+            self._spawn(index)
+        for name in list(storage.accounts):
+            self._attach(name)
+        self._reader = asyncio.create_task(self._read_events())
+        self._watchdog = asyncio.create_task(self._watch())
+        print(f"🧩 Аккаунты распределены по процессам: {shard_count}")
+
+    def _spawn(self, index):
+        # Новая очередь: запросы к упавшему процессу не должны выполниться повторно
+        self._requests[index] = self._context.Queue()
+        process = self._context.Process(
+            target=shard_main,
+            args=(index, self._requests[index], self._events),
+            name=f"shard-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _attach(self, name):
+        """Передаёт аккаунт его шарду и заменяет клиент в storage на RemoteClient"""
+        acc = storage.accounts[name]
+        shard = shard_of(name, self.shard_count)
+        acc["client"] = RemoteClient(self, name, shard)
+        self._requests[shard].put((None, "add", (
+            name, acc["api_id"], acc["api_hash"],
+            storage.rate_limits.get(name), storage.peers.get(name),
+        )))
+
+    async def adopt(self, name):
+        """Передаёт шарду только что авторизованный аккаунт"""
+        if not self.active or name not in storage.accounts:
+            return
+        # Файл сессии может открыть только один процесс
+        await storage.accounts[name]["client"].disconnect()
+        self._attach(name)
+
+    def detach(self, name):
+        """Убирает удалённый аккаунт из его шарда"""
+        if self.active:
+            self._requests[shard_of(name, self.shard_count)].put((None, "remove", (name,)))
+
+    def drop_media(self, shard, file_id, file_unique_id):
+        """Шард забывает медиафайл, закрытый в процессе бота"""
+        if self.active:
+            self._requests[shard].put((None, "drop_media", (file_id, file_unique_id)))
+
+    async def request(self, shard, op, *args):
+        req_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = (shard, future)
+        self._requests[shard].put((req_id, op, args))
+        try:
+            return await future
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def _read_events(self):
+        while True:
+            event = await asyncio.to_thread(self._events.get)
+            if event is None:
+                return
+            try:
+                self._apply(event)
+            except Exception as e:
+                print(f"❌ Ошибка обработки события шарда: {e}")
+                traceback.print_exc()
+
+    def _apply(self, event):
+        kind = event[0]
+        if kind in ("result", "error"):
+            _, req_id, value = event
+            pending = self._pending.get(req_id)
+            if pending is None or pending[1].done():
+                return
+            if kind == "result":
+                pending[1].set_result(value)
+            else:
+                pending[1].set_exception(RuntimeError(value))
+
+        elif kind == "save":
+            _, name, data, keys = event
+            collection = getattr(storage, name)
+            keys = list(data) if keys is None else keys
+            for key in keys:
+                if key in data:
+                    collection[key] = data[key]
+                else:
+                    collection.pop(key, None)
+            if keys:
+                getattr(storage, f"save_{name}")(*keys)
+
+        elif kind == "health":
+            _, name, state, error, is_open, connected = event
+            acc = storage.accounts.get(name)
+            if acc is None or not acc["client"].remote:
+                return
+            acc["client"].open = is_open
+            acc["client"].connected = connected
+            if health.state(name) != state or health.error(name) != error:
+                health.mark(name, state, error)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            for index, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                print(f"❌ Шард {index} завершился (код {process.exitcode}), перезапуск")
+                for shard, future in list(self._pending.values()):
+                    if shard == index and not future.done():
+                        future.set_exception(ConnectionError(f"шард {index} перезапущен"))
+                self._spawn(index)
+                for name, acc in list(storage.accounts.items()):
+                    if acc["client"].remote and acc["client"].shard == index:
+                        self._attach(name)
+
+    async def stop(self):
+        """Останавливает шарды; их последние изменения применяются до выхода"""
+        if not self.active:
+            return
+        self._watchdog.cancel()
+        for queue in self._requests:
+            queue.put(None)
+        await asyncio.to_thread(lambda: [process.join(10) for process in self._processes])
+        self._events.put(None)
+        await self._reader
+
+
+shard_manager = ShardManager()
@@ -0,0 +1,192 @@
+# utils/stats_engine.py
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from database.storage import storage
+from utils.peer_cache import target_key
+
+# Разрешения: (секунд в корзине, число корзин)
+RESOLUTIONS = {
+    "minute": (60, 60),      # последний час
+    "hour": (3600, 168),     # последние 7 дней
+    "day": (86400, 90),      # последние 90 дней
+}
+
+# Сколько последних событий хранить в history аккаунта
+HISTORY_SIZE = 10
+
+
+def _local_ts():
+    """Текущее время с учётом часового пояса, чтобы сутки начинались в полночь"""
+    now = datetime.now().astimezone()
+    return time.time() + now.utcoffset().total_seconds()
+
+
+class RingCounter:
+    """Счётчики по фиксированным временным корзинам в кольцевом буфере array('L').
+
+    head - номер самой свежей корзины (время // ширина корзины).
+    Память фиксирована: size чисел независимо от числа отправок.
+    """
+
+    __slots__ = ("width", "size", "head", "counts")
+
+    def __init__(self, width, size, head=0, counts=None):
+        self.width = width
+        self.size = size
+        self.head = head
+        self.counts = array("L", counts if counts else [0] * size)
+
+    def _advance(self, bucket):
+        if bucket - self.head >= self.size:
+            self.counts = array("L", [0] * self.size)
+        else:
+            for b in range(self.head + 1, bucket + 1):
+                self.counts[b % self.size] = 0
+        self.head = bucket
+
+    def add(self, ts, n=1):
+        bucket = int(ts // self.width)
+        if bucket > self.head:
+            self._advance(bucket)
+        elif bucket <= self.head - self.size:
+            return
+        self.counts[bucket % self.size] += n
+
+    def total(self, last_n, ts=None):
+        """Сумма за последние last_n корзин (включая текущую)"""
+        now_bucket = int((_local_ts() if ts is None else ts) // self.width)
+        last_n = min(last_n, self.size)
+        first = max(now_bucket - last_n + 1, self.head - self.size + 1)
+        return sum(self.counts[b % self.size] for b in range(first, min(now_bucket, self.head) + 1))
+
+    def to_dict(self):
+        return {"head": self.head, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, width, size, data):
+        counts = list(data.get("counts", []))
+        if len(counts) != size:
+            counts = None
+        return cls(width, size, data.get("head", 0), counts)
+
+
+class StatsEngine:
+    """Агрегаты отправок по аккаунтам, получателям и типам контента.
+
+    Для каждой пары (измерение, ключ) хранятся счётчики по минутам,
+    часам и дням. Запрос вида "отправки аккаунта за 7 дней" стоит O(корзин).
+    Данные лежат в storage.stats_buckets под ключом "измерение:ключ".
+    """
+
+    def __init__(self):
+        self._series = {}
+
+    def _get(self, series_key):
+        series = self._series.get(series_key)
+        if series is None:
+            raw = storage.stats_buckets.get(series_key, {})
+            series = {
+                res: RingCounter.from_dict(width, size, raw.get(res, {}))
+                for res, (width, size) in RESOLUTIONS.items()
+            }
+            self._series[series_key] = series
+            storage.stats_buckets[series_key] = {res: ring.to_dict() for res, ring in series.items()}
+        return series
+
+    def record(self, account_name, target_id, content_type, ts=None):
+        ts = _local_ts() if ts is None else ts
+        keys = [
+            "total:all",
+            f"account:{account_name}",
+            f"target:{target_id}",
+            f"type:{content_type}",
+        ]
+        for series_key in keys:
+            series = self._get(series_key)
+            for ring in series.values():
+                ring.add(ts)
+            # head меняется при сдвиге корзин - обновляем сохраняемое представление
+            storage.stats_buckets[series_key] = {res: ring.to_dict() for res, ring in series.items()}
+        storage.save_stats_buckets(*keys)
+
+    def forget_targets(self, *target_ids):
+        """Удаляет ряды удалённых получателей, чтобы stats_buckets не рос со сменой получателей"""
+        removed = []
+        for target_id in target_ids:
+            series_key = f"target:{target_id}"
+            self._series.pop(series_key, None)
+            if storage.stats_buckets.pop(series_key, None) is not None:
+                removed.append(series_key)
+        if removed:
+            storage.save_stats_buckets(*removed)
+
+    def count(self, dimension, key, resolution, last_n):
+        """Число отправок за последние last_n корзин разрешения resolution"""
+        series_key = f"{dimension}:{key}"
+        if series_key not in self._series and series_key not in storage.stats_buckets:
+            return 0
+        return self._get(series_key)[resolution].total(last_n)
+
+
+stats_engine = StatsEngine()
+
+
+def recent_events(account_name):
+    """Последние события аккаунта (deque фиксированной длины, старые вытесняются сами)"""
+    acc_stats = storage.account_stats.get(account_name)
+    if acc_stats is None:
+        return deque(maxlen=HISTORY_SIZE)
+    history = acc_stats.get("history")
+    if not isinstance(history, deque):
+        history = deque(history or [], maxlen=HISTORY_SIZE)
+        acc_stats["history"] = history
+    return history
+
+
+def latest_send():
+    """Последняя отправка среди всех аккаунтов: {"time", "account", "target", "text"} или None"""
+    latest = storage.stats.get("latest")
+    if latest is None:
+        # Статистика из старых версий: вычисляем один раз по history
+        for account_name in storage.account_stats:
+            history = recent_events(account_name)
+            if history and (latest is None or history[-1]["time"] > latest["time"]):
+                latest = {"account": account_name, **history[-1]}
+        if latest is not None:
+            storage.stats["latest"] = latest
+    return latest
+
+
+def record_send(account_name, target_data, text, media_type):
+    """Учитывает успешную отправку в общей статистике, history аккаунта и агрегатах"""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if target_data["type"] == "user":
+        target_name = f"@{target_data['username']}"
+    else:
+        target_name = f"Группа {target_data['chat_id']}"
+
+    if account_name not in storage.account_stats:
+        storage.account_stats[account_name] = {"sent": 0, "history": []}
+
+    storage.account_stats[account_name]["sent"] += 1
+
+    display_text = text[:50] + "..." if text and len(text) > 50 else (text if text else "")
+    if media_type != "text":
+        display_text = f"[{media_type.upper()}] {display_text}"
+
+    event = {
+        "time": now,
+        "target": target_name,
+        "text": display_text
+    }
+    # Подробности храним только для последних событий, остальное - в агрегатах
+    recent_events(account_name).append(event)
+
+    storage.stats["sent"] = storage.stats.get("sent", 0) + 1
+    storage.stats["last_send"] = now
+    storage.stats["latest"] = {"account": account_name, **event}
+
+    storage.save_stats(account_name)
+    stats_engine.record(account_name, target_key(target_data), media_type)
@@ -5,14 +5,28 @@ from telethon.errors import (
     PhoneCodeExpiredError,
     PhoneCodeInvalidError,
     PhoneCodeHashEmptyError,
+    FloodWaitError,
+    FilePartMissingError,
 )
 from database.storage import storage
-from datetime import datetime
-import os
+from utils.rate_limiter import rate_limiter
+from utils.media import MediaHandle
+from utils.peer_cache import peer_cache, PEER_INVALID_ERRORS
+from utils.clients import LazyClient
+from utils.health import health
 
 auth_processes = {}
 
 
+class AccountFloodWait(Exception):
+    """Аккаунт получил FloodWait - отправку нужно повторить позже или другим аккаунтом"""
+
+    def __init__(self, account_name, seconds):
+        super().__init__(f"{account_name}: FloodWait {seconds} сек")
+        self.account_name = account_name
+        self.seconds = seconds
+
+
 async def start_auth(user_id: int, session_name: str, api_id: int, api_hash: str, phone: str):
     """Начинает процесс авторизации: создаёт клиент и отправляет код."""
     try:
@@ -31,6 +45,21 @@ async def start_auth(user_id: int, session_name: str, api_id: int, api_hash: str
         return False, f"Ошибка отправки кода: {e}"
 
 
+async def _register_account(auth, client):
+    """Сохраняет авторизованный аккаунт; в режиме шардов передаёт его клиент процессу-шарду"""
+    from utils.shards import shard_manager
+
+    storage.accounts[auth["session_name"]] = {
+        "api_id": auth["api_id"],
+        "api_hash": auth["api_hash"],
+        "phone": auth["phone"],
+        "client": LazyClient(auth["session_name"], auth["api_id"], auth["api_hash"], client),
+    }
+    storage.save_accounts(auth["session_name"])
+    health.mark(auth["session_name"], "authorized")
+    await shard_manager.adopt(auth["session_name"])
+
+
 async def submit_code(user_id: int, raw_input: str):
     """
     Принимает код от пользователя и выполняет sign_in.
@@ -55,13 +84,7 @@ async def submit_code(user_id: int, raw_input: str):
         await client.sign_in(phone, code=code)
 
 
-        storage.accounts[auth["session_name"]] = {
-            "api_id": auth["api_id"],
-            "api_hash": auth["api_hash"],
-            "phone": phone,
-            "client": client,
-        }
-        storage.save_accounts()
+        await _register_account(auth, client)
         del auth_processes[user_id]
 
         return True, f"✅ Аккаунт '{auth['session_name']}' успешно добавлен!"
@@ -91,13 +114,7 @@ async def submit_password(user_id: int, password: str):
     try:
         await client.sign_in(password=password.strip())
 
-        storage.accounts[auth["session_name"]] = {
-            "api_id": auth["api_id"],
-            "api_hash": auth["api_hash"],
-            "phone": auth["phone"],
-            "client": client,
-        }
-        storage.save_accounts()
+        await _register_account(auth, client)
         del auth_processes[user_id]
 
         return True, f"✅ Аккаунт '{auth['session_name']}' успешно добавлен!"
@@ -116,68 +133,66 @@ async def cancel_auth(user_id: int):
         del auth_processes[user_id]
 
 
-async def send_telegram_message(client, target_data, text, account_name, media_type="text", file_id=None, bot=None):
-    """Отправка сообщения через указанный аккаунт с поддержкой медиа."""
-    try:
-        if not client.is_connected():
-            await client.connect()
-
-        if target_data["type"] == "user":
-            recipient = target_data["username"]
-            target_name = f"@{target_data['username']}"
-        else:
-            recipient = int(target_data["chat_id"])
-            target_name = f"Группа {target_data['chat_id']}"
-
-        if media_type == "text":
-            await client.send_message(recipient, text, parse_mode='html', link_preview=False)
-
-        elif media_type in ["photo", "video", "document"] and file_id and bot:
-            os.makedirs("temp_media", exist_ok=True)
-
-            if media_type == "photo":
-                file_path = f"temp_media/{file_id}.jpg"
-            elif media_type == "video":
-                file_path = f"temp_media/{file_id}.mp4"
-            else:  # document
-                file_path = f"temp_media/{file_id}"
-
-            await bot.download(file_id, destination=file_path)
-            await client.send_file(recipient, file_path, caption=text if text else None)
+async def _send_content(client, recipient, text, account_name, media_type, file_id, bot, media):
+    """Отправляет текст или медиа уже разрешённому получателю"""
+    if media_type == "text":
+        await client.send_message(recipient, text, parse_mode='html', link_preview=False)
 
+    elif media_type in ["photo", "video", "document"] and file_id and (media or bot):
+        # Без общего MediaHandle рассылки создаём разовый
+        handle = media or MediaHandle(bot, file_id, media_type)
+        try:
             try:
-                os.remove(file_path)
-            except:
-                pass
-        else:
-            await client.send_message(recipient, text if text else "")
-
-
-        storage.stats["sent"] = storage.stats.get("sent", 0) + 1
-        storage.stats["last_send"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        if account_name not in storage.account_stats:
-            storage.account_stats[account_name] = {"sent": 0, "history": []}
-
-        storage.account_stats[account_name]["sent"] += 1
-
-        display_text = text[:50] + "..." if text and len(text) > 50 else (text if text else "")
-        if media_type != "text":
-            display_text = f"[{media_type.upper()}] {display_text}"
-
-        storage.account_stats[account_name]["history"].append({
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "target": target_name,
-            "text": display_text
-        })
+                input_file = await handle.input_file(client, account_name)
+                await client.send_file(recipient, input_file, caption=text if text else None)
+            except FilePartMissingError:
+                # Сервер забыл загруженные части - загружаем заново
+                handle.forget(account_name)
+                input_file = await handle.input_file(client, account_name)
+                await client.send_file(recipient, input_file, caption=text if text else None)
+        finally:
+            if media is None:
+                handle.close()
+    else:
+        await client.send_message(recipient, text if text else "")
+
+
+async def send_telegram_message(client, target_data, text, account_name, media_type="text", file_id=None, bot=None, media=None):
+    """Отправка сообщения через указанный аккаунт с поддержкой медиа.
+
+    media - общий MediaHandle рассылки: файл скачивается и загружается
+    на аккаунт один раз для всех получателей.
+
+    Статистику отправки ведёт вызывающий (send_with_failover), так как
+    в режиме шардов эта функция выполняется в процессе-шарде.
+
+    При FloodWait аккаунт ставится на паузу и выбрасывается AccountFloodWait.
+    """
+    try:
+        if not await rate_limiter.acquire(account_name):
+            return False
 
-        if len(storage.account_stats[account_name]["history"]) > 100:
-            storage.account_stats[account_name]["history"] = storage.account_stats[account_name]["history"][-100:]
+        if not client.is_connected():
+            await client.connect()
 
-        storage.save_stats()
+        recipient = await peer_cache.resolve(client, account_name, target_data)
+        try:
+            await _send_content(client, recipient, text, account_name, media_type, file_id, bot, media)
+        except PEER_INVALID_ERRORS:
+            # Сохранённый peer устарел - разрешаем получателя заново
+            peer_cache.invalidate(account_name, target_data)
+            recipient = await peer_cache.resolve(client, account_name, target_data)
+            await _send_content(client, recipient, text, account_name, media_type, file_id, bot, media)
+
+        health.mark(account_name, "authorized")
         return True
 
+    except FloodWaitError as e:
+        rate_limiter.park(account_name, e.seconds)
+        raise AccountFloodWait(account_name, e.seconds)
+
     except Exception as e:
+        health.record_error(account_name, e)
         print(f"Ошибка отправки от {account_name}: {e}")
         import traceback
         traceback.print_exc()